@@ -0,0 +1,94 @@
+"""
+Model artifact format - Step 43
+An artifact is a directory with a versioned manifest.json (feature columns, model name,
+training-data hash, metrics) and the estimator weights in model.joblib. Uncompressed
+NumPy weights (e.g. coef_, GradientBoosting stages) can be memory-mapped, so several
+scoring workers share one page-cache copy instead of each deserializing their own.
+"""
+import hashlib
+import json
+import os
+import pickle
+from datetime import datetime, timezone
+import joblib
+import pandas as pd
+import sklearn
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+WEIGHTS_FILE = 'model.joblib'
+
+def training_data_hash(X, y):
+    """Stable content hash of the training matrix and labels"""
+    digest = hashlib.sha256()
+    digest.update(','.join(map(str, X.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(pd.Series(y), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def save_artifact(artifact_dir, model, model_name, feature_cols, data_hash=None, metrics=None, compress=0):
+    """Write manifest.json + model.joblib; compress > 0 trades mmap support for size"""
+    os.makedirs(artifact_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(artifact_dir, WEIGHTS_FILE), compress=compress)
+    
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_name': model_name,
+        'estimator': type(model).__name__,
+        'feature_columns': list(feature_cols),
+        'training_data_hash': data_hash,
+        'metrics': metrics or {},
+        'weights_file': WEIGHTS_FILE,
+        'compressed': bool(compress),
+        'sklearn_version': sklearn.__version__,
+        'created_at': datetime.now(timezone.utc).isoformat()
+    }
+    # Manifest last: a directory with a manifest always has complete weights
+    with open(os.path.join(artifact_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return artifact_dir
+
+def read_manifest(artifact_dir):
+    """Read and version-check an artifact manifest"""
+    with open(os.path.join(artifact_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version {manifest.get('format_version')} "
+                         f"in {artifact_dir} (expected {FORMAT_VERSION})")
+    if manifest.get('sklearn_version') != sklearn.__version__:
+        print(f"Warning: artifact was trained with scikit-learn {manifest.get('sklearn_version')}, "
+              f"running {sklearn.__version__}")
+    return manifest
+
+def check_feature_schema(manifest, columns):
+    """Raise ValueError if columns do not provide every feature the model was trained on"""
+    missing = [c for c in manifest['feature_columns'] if c not in set(columns)]
+    if missing:
+        raise ValueError(f"Feature schema mismatch for {manifest['model_name']}: missing {missing}")
+
+def load_artifact(artifact_dir, mmap=True, expected_features=None):
+    """Load an artifact as {'model', 'feature_columns', 'model_name', 'manifest'}
+
+    mmap maps NumPy weight arrays read-only instead of copying them into this process
+    (sklearn tree nodes are still copied when the trees are rebuilt).
+    expected_features, if given, must match the manifest's feature columns exactly.
+    """
+    manifest = read_manifest(artifact_dir)
+    if expected_features is not None and list(expected_features) != manifest['feature_columns']:
+        raise ValueError(f"Feature schema mismatch for {manifest['model_name']}: "
+                         f"artifact has {manifest['feature_columns']}, expected {list(expected_features)}")
+    mmap_mode = 'r' if mmap and not manifest.get('compressed') else None
+    model = joblib.load(os.path.join(artifact_dir, manifest['weights_file']), mmap_mode=mmap_mode)
+    return {
+        'model': model,
+        'feature_columns': manifest['feature_columns'],
+        'model_name': manifest['model_name'],
+        'manifest': manifest
+    }
+
+def load_model(path, mmap=True):
+    """Load an artifact directory, or a legacy model_<name>.pkl pickle"""
+    if os.path.isdir(path):
+        return load_artifact(path, mmap=mmap)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
@@ -0,0 +1,267 @@
+"""
+End-to-end benchmark suite
+Times each pipeline stage on a synthetic career dataset (synthetic.py): CSV parsing,
+loading into a local SQLite stand-in for PLAYER_SEASON_DATA, feature computation,
+baseline training and the Streamlit dashboard aggregations. Results are written to a
+JSON file; pass an earlier file as --baseline to flag stages that got slower.
+
+Usage: python ml/benchmark.py --players 2000 --output benchmark_results.json [--baseline old.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.model_selection import train_test_split
+
+import connections
+from features import compute_features, load_raw_csv
+from load_data import load_csv_bulk, load_csv_to_snowflake
+from readers import COLUMNS, iter_chunks, peak_rss_mb
+from synthetic import generate_career_dataset
+from train_model import define_target, prepare_features, train_baseline_model
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'streamlit'))
+from dashboard import compute_view, filter_frame, normalize_types, options_from_frame
+
+STAGES = [
+    'parse_csv_readers', 'parse_csv_pandas', 'load_row_by_row', 'load_executemany',
+    'compute_features', 'train_baseline', 'dashboard_normalize', 'dashboard_views'
+]
+
+# Stages that reuse a frame built by an earlier stage
+STAGE_DEPENDENCIES = {
+    'train_baseline': 'compute_features',
+    'dashboard_normalize': 'compute_features',
+    'dashboard_views': 'dashboard_normalize',
+}
+
+# A stage this much slower than the baseline counts as a regression
+DEFAULT_REGRESSION_RATIO = 1.2
+
+class SQLiteRawPool:
+    """Stand-in for get_pool('RAW'): one in-memory SQLite PLAYER_SEASON_DATA table"""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.conn.execute(f"CREATE TABLE PLAYER_SEASON_DATA ({', '.join(COLUMNS)})")
+
+    def acquire(self, timeout=None):
+        return _SQLiteConnection(self.conn)
+
+    def release(self, conn):
+        pass
+
+    def row_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM PLAYER_SEASON_DATA").fetchone()[0]
+
+class _SQLiteConnection:
+    """The connector calls load_data.py makes, translated to SQLite"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        return self
+
+    @staticmethod
+    def _translate(sql):
+        sql = sql.replace('LITMANEN.RAW.', '').replace('%s', '?')
+        return sql.replace('TRUNCATE TABLE', 'DELETE FROM')
+
+    def execute(self, sql, params=()):
+        self.conn.execute(self._translate(sql), params)
+        return self
+
+    def executemany(self, sql, rows):
+        self.conn.executemany(self._translate(sql), rows)
+        return self
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        pass
+
+def _quiet(func, *args, **kwargs):
+    """Run func with its progress prints swallowed"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+def time_stage(func, repeat):
+    """Best-of-repeat wall time of func(); func returns the number of rows it processed"""
+    runs = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = func()
+        runs.append(time.perf_counter() - start)
+    best = min(runs)
+    return {
+        'rows': int(rows),
+        'seconds': best,
+        'runs': runs,
+        'rows_per_sec': rows / best if best > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def _stage_functions(csv_path, raw_df, tmp_dir):
+    """Stage name -> zero-argument callable returning rows processed"""
+    state = {}
+    manifest_path = os.path.join(tmp_dir, 'load_manifest.json')
+
+    def parse_csv_readers():
+        return sum(len(chunk['season']) for chunk in iter_chunks(csv_path))
+
+    def parse_csv_pandas():
+        return len(load_raw_csv(csv_path))
+
+    def load(func, **kwargs):
+        pool = SQLiteRawPool()
+        previous = connections.set_pool('RAW', pool)
+        try:
+            _quiet(func, csv_path, manifest_path=manifest_path, **kwargs)
+        finally:
+            connections.set_pool('RAW', previous)
+        loaded = pool.row_count()
+        if loaded != len(raw_df):
+            raise RuntimeError(f"{func.__name__} loaded {loaded} of {len(raw_df)} rows")
+        return loaded
+
+    def features():
+        state['features'] = compute_features(raw_df)
+        return len(state['features'])
+
+    def train():
+        df = _quiet(define_target, state['features'].copy())
+        X, y, _ = prepare_features(df)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+        _quiet(train_baseline_model, X_train, y_train, X_test, y_test)
+        return len(X_train)
+
+    def dashboard_normalize():
+        state['typed'] = normalize_types(state['features'].copy())
+        return len(state['typed'])
+
+    def dashboard_views():
+        # The first render plus a club, a competition and a year-range selection
+        df = state['typed']
+        club = df['club'].value_counts().index[0]
+        competition = df['competition'].value_counts().index[0]
+        year_min, year_max = int(df['season_start_year'].min()), int(df['season_start_year'].max())
+        options_from_frame(df)
+        for selection in [('All', 'All', year_min, year_max), (club, 'All', year_min, year_max),
+                          ('All', competition, year_min, year_max), ('All', 'All', 1990, 2000)]:
+            compute_view(filter_frame(df, *selection))
+        return len(df)
+
+    return {
+        'parse_csv_readers': parse_csv_readers,
+        'parse_csv_pandas': parse_csv_pandas,
+        'load_row_by_row': lambda: load(load_csv_to_snowflake),
+        'load_executemany': lambda: load(load_csv_bulk, method='executemany'),
+        'compute_features': features,
+        'train_baseline': train,
+        'dashboard_normalize': dashboard_normalize,
+        'dashboard_views': dashboard_views,
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_suite(n_players=2000, seed=42, repeat=3, stages=STAGES):
+    """Generate the dataset, run the selected stages and return the results dict"""
+    # Pull in the stages whose frames the selected ones reuse, then run in suite order
+    selected = set(stages)
+    for stage in reversed(STAGES):
+        if stage in selected and stage in STAGE_DEPENDENCIES:
+            selected.add(STAGE_DEPENDENCIES[stage])
+    stages = [stage for stage in STAGES if stage in selected]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+        raw_df = generate_career_dataset(n_players, seed=seed)
+        generate_seconds = time.perf_counter() - start
+        csv_path = os.path.join(tmp_dir, 'synthetic_careers.csv')
+        raw_df.to_csv(csv_path, index=False)
+        print(f"Dataset: {len(raw_df):,} rows for {n_players:,} players "
+              f"(generated in {generate_seconds:.2f}s, {os.path.getsize(csv_path) / 1e6:.1f} MB CSV)")
+
+        functions = _stage_functions(csv_path, raw_df, tmp_dir)
+        results = {}
+        for stage in stages:
+            results[stage] = time_stage(functions[stage], repeat)
+            r = results[stage]
+            print(f"  {stage:<20} {r['seconds']:>8.3f}s  {r['rows_per_sec'] or 0:>12,.0f} rows/sec")
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'packages': {'numpy': np.__version__, 'pandas': pd.__version__, 'sklearn': sklearn.__version__},
+        'config': {'players': n_players, 'seed': seed, 'repeat': repeat},
+        'dataset': {'rows': len(raw_df), 'players': n_players, 'generate_seconds': generate_seconds},
+        'stages': results,
+    }
+
+def compare(results, baseline, max_ratio=DEFAULT_REGRESSION_RATIO):
+    """Print time ratios against a baseline run; returns the stages slower than max_ratio"""
+    regressions = []
+    print(f"\nAgainst baseline {baseline.get('git_commit')} ({baseline.get('timestamp')}):")
+    for stage, r in results['stages'].items():
+        before = baseline.get('stages', {}).get(stage)
+        if not before or not before.get('rows_per_sec') or not r['rows_per_sec']:
+            continue
+        # Compare throughput so runs on different dataset sizes stay comparable
+        ratio = before['rows_per_sec'] / r['rows_per_sec']
+        flag = 'REGRESSION' if ratio > max_ratio else ''
+        if flag:
+            regressions.append(stage)
+        print(f"  {stage:<20} {ratio:>6.2f}x time per row {flag}")
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic career data")
+    parser.add_argument('--players', type=int, default=2000, help="Synthetic players to generate")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per stage (best is reported)")
+    parser.add_argument('--stages', default=','.join(STAGES), help="Comma-separated subset of stages")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON results file")
+    parser.add_argument('--baseline', help="Earlier results file to compare against")
+    parser.add_argument('--max-ratio', type=float, default=DEFAULT_REGRESSION_RATIO,
+                        help="Time-per-row ratio over the baseline that counts as a regression")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    selected = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(selected) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+    results = run_suite(args.players, seed=args.seed, repeat=args.repeat, stages=selected)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.max_ratio)
+        raise SystemExit(1 if regressions else 0)
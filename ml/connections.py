@@ -0,0 +1,168 @@
+"""
+Shared Snowflake connection layer
+One place for connection parameters, plus a bounded pool that reuses authenticated
+sessions instead of paying the login handshake on every call.
+"""
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import snowflake.connector
+
+# Load environment variables
+load_dotenv()
+
+# 'snowflake', or 'duckdb' for the embedded stand-in database (local_warehouse.py)
+BACKEND = os.getenv('LITMANEN_BACKEND', 'snowflake').lower()
+
+def connection_params(schema='FEATURES'):
+    """Snowflake connection parameters from the environment"""
+    return {
+        'account': os.getenv('SNOWFLAKE_ACCOUNT'),
+        'user': os.getenv('SNOWFLAKE_USER'),
+        'password': os.getenv('SNOWFLAKE_PASSWORD'),
+        'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE'),
+        'database': 'LITMANEN',
+        'schema': schema,
+        'role': os.getenv('SNOWFLAKE_ROLE', 'ACCOUNTADMIN')
+    }
+
+def get_snowflake_connection(schema='FEATURES'):
+    """Create a new, unpooled Snowflake connection"""
+    return snowflake.connector.connect(**connection_params(schema))
+
+class ConnectionPool:
+    """Bounded pool of Snowflake connections with keep-alive and connect/reuse counters"""
+    
+    def __init__(self, schema='FEATURES', max_size=4, validate_after=300):
+        # client_session_keep_alive stops idle pooled sessions from expiring
+        self.params = {**connection_params(schema), 'client_session_keep_alive': True}
+        self.max_size = max_size
+        self.validate_after = validate_after
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self.stats = {'connects': 0, 'reuses': 0, 'discarded': 0, 'connect_seconds': 0.0}
+    
+    def _connect(self):
+        start = time.perf_counter()
+        conn = snowflake.connector.connect(**self.params)
+        with self._lock:
+            self.stats['connects'] += 1
+            self.stats['connect_seconds'] += time.perf_counter() - start
+        return conn
+    
+    def _is_usable(self, conn, idle_seconds):
+        if conn.is_closed():
+            return False
+        if idle_seconds < self.validate_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1").fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+    
+    def acquire(self, timeout=None):
+        """Borrow a connection, blocking while max_size connections are in use"""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No Snowflake connection available within {timeout}s")
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    return self._connect()
+                conn, last_used = item
+                if self._is_usable(conn, time.monotonic() - last_used):
+                    with self._lock:
+                        self.stats['reuses'] += 1
+                    return conn
+                with self._lock:
+                    self.stats['discarded'] += 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def release(self, conn):
+        """Return a borrowed connection to the pool"""
+        try:
+            if not conn.is_closed():
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+    
+    @contextmanager
+    def connection(self, timeout=None):
+        """with pool.connection() as conn: ... (rolled back on error, then returned to the pool)"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            self.release(conn)
+    
+    def close_all(self):
+        """Close idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+    
+    def summary(self):
+        """One-line connect vs reuse report"""
+        s = self.stats
+        avg = s['connect_seconds'] / s['connects'] if s['connects'] else 0.0
+        return (f"{s['connects']} connects ({avg:.2f}s avg handshake), {s['reuses']} reuses, "
+                f"~{s['reuses'] * avg:.1f}s of login time saved")
+
+def create_pool(schema='FEATURES', max_size=4):
+    """New pool on the configured backend"""
+    if BACKEND == 'duckdb':
+        from local_warehouse import LocalPool
+        return LocalPool(schema)
+    return ConnectionPool(schema, max_size)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(schema='FEATURES', max_size=4):
+    """Process-wide pool per schema"""
+    with _pools_lock:
+        pool = _pools.get(schema)
+        if pool is None:
+            pool = _pools[schema] = create_pool(schema, max_size)
+        return pool
+
+def set_pool(schema, pool):
+    """Serve get_pool(schema) from pool (anything with acquire/release), e.g. a local stand-in
+    database; None drops the override. Returns the pool it replaced, or None"""
+    with _pools_lock:
+        previous = _pools.pop(schema, None)
+        if pool is not None:
+            _pools[schema] = pool
+        return previous
+
+@atexit.register
+def _close_pools():
+    for pool in list(_pools.values()):
+        pool.close_all()
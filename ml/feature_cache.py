@@ -0,0 +1,151 @@
+"""
+On-disk snapshot cache for feature pulls
+Snapshots are Parquet files keyed by the query text plus a freshness token from the source,
+so unchanged features load from disk instead of re-running the warehouse query.
+"""
+import glob
+import hashlib
+import os
+import threading
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), '.feature_cache')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+RAW_TABLE = 'LITMANEN.RAW.PLAYER_SEASON_DATA'
+
+LAST_ALTERED_SQL = """
+    SELECT TABLE_SCHEMA, TABLE_NAME, LAST_ALTERED
+    FROM LITMANEN.INFORMATION_SCHEMA.TABLES
+    WHERE {tables}
+    ORDER BY TABLE_SCHEMA, TABLE_NAME
+"""
+
+def _schema_and_name(relation):
+    """('FEATURES', 'FEATURE_ROLLUP') for LITMANEN.FEATURES.FEATURE_ROLLUP"""
+    parts = relation.upper().split('.')
+    return (parts[-2] if len(parts) > 1 else 'FEATURES'), parts[-1]
+
+def probe_freshness(cursor, relation, player_id=None, also_read=()):
+    """Cheap freshness token: row count and max season_start_year of relation, plus the
+    last-altered time of the raw table and of every relation read (relation, also_read)
+
+    Materialized and dynamic tables (LITMANEN_FEATURES_TABLE, FEATURE_ROLLUP) refresh some time
+    after a raw load; their own LAST_ALTERED moves the token again once the refresh lands, so a
+    result read before it is not kept. It also catches updates that leave COUNT and MAX alone.
+    """
+    if player_id is None:
+        cursor.execute(f"SELECT COUNT(*), MAX(season_start_year) FROM {relation}")
+    else:
+        cursor.execute(f"SELECT COUNT(*), MAX(season_start_year) FROM {relation} WHERE player_id = %s", (player_id,))
+    row_count, max_year = cursor.fetchone()
+    tables = sorted({_schema_and_name(r) for r in (RAW_TABLE, relation, *also_read)})
+    params = [value for table in tables for value in table]
+    cursor.execute(LAST_ALTERED_SQL.format(
+        tables=' OR '.join(['(TABLE_SCHEMA = %s AND TABLE_NAME = %s)'] * len(tables))
+    ), params)
+    last_altered = '|'.join(f"{schema}.{name}={altered}" for schema, name, altered in cursor.fetchall())
+    return f"{row_count}|{max_year}|{last_altered}"
+
+def cache_key(query, freshness):
+    """Snapshot key from normalized query text and freshness token"""
+    normalized = ' '.join(query.split())
+    return hashlib.sha256(f"{normalized}\n{freshness}".encode('utf-8')).hexdigest()[:32]
+
+def _snapshot_path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.parquet")
+
+def load_snapshot(key, cache_dir=DEFAULT_CACHE_DIR):
+    """Return the cached DataFrame for key, or None on a miss"""
+    path = _snapshot_path(key, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path, memory_map=True)
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+    # mtime doubles as last-used time for eviction
+    os.utime(path)
+    return df
+
+def store_snapshot(key, df, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """Write df as the snapshot for key, then evict least recently used snapshots"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _snapshot_path(key, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_bytes)
+    return path
+
+def evict(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """Delete least recently used snapshots until the cache fits in max_bytes"""
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, '*.parquet')):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+def clear(cache_dir=DEFAULT_CACHE_DIR):
+    """Remove every snapshot"""
+    return evict(cache_dir, max_bytes=0)
+
+class SnapshotStore:
+    """Snapshots in one directory behind a get-or-load call, with hit and miss counters
+
+    Writes are atomic and eviction goes by file mtime, so several processes can share a directory;
+    the counters are per process.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_or_load(self, query, freshness, loader):
+        """Snapshot for (query, freshness), else loader() stored as the new snapshot (None is not stored)"""
+        key = cache_key(query, freshness)
+        df = load_snapshot(key, self.cache_dir)
+        with self.lock:
+            if df is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if df is not None:
+            return df
+        df = loader()
+        if df is not None:
+            try:
+                store_snapshot(key, df, self.cache_dir, self.max_bytes)
+            except Exception as e:
+                print(f"Could not store snapshot {key}: {e}")
+        return df
+
+    def summary(self):
+        """e.g. '12 hits, 3 misses, 5 snapshots (1.2 MB)'"""
+        sizes = []
+        for path in glob.glob(os.path.join(self.cache_dir, '*.parquet')):
+            try:
+                sizes.append(os.path.getsize(path))
+            except FileNotFoundError:
+                pass
+        return (f"{self.hits} hits, {self.misses} misses, "
+                f"{len(sizes)} snapshots ({sum(sizes) / (1024 * 1024):.1f} MB)")
@@ -0,0 +1,181 @@
+"""
+Local feature computation - mirrors LITMANEN.FEATURES.LITMANEN_FEATURES
+Computes the columns of snowflake/03_create_features.sql with vectorized pandas,
+so training and the local app can run offline against the raw CSV.
+"""
+import argparse
+import os
+import re
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from readers import DEFAULT_PLAYER_ID
+
+RAW_COLUMNS = ['season', 'competition', 'club', 'appearances', 'starts', 'ppg', 'minutes', 'player_id']
+FEATURE_COLUMNS = [
+    'player_id', 'season', 'competition', 'club', 'appearances', 'starts', 'ppg', 'minutes',
+    'appearance_ratio', 'minutes_ratio', 'season_start_year'
+]
+
+# Window partition of the ratio features
+PARTITION_COLUMNS = ['player_id', 'competition', 'season']
+
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'litmanen_career_dataset_full.csv')
+FEATURES_SQL_PATH = os.path.join(os.path.dirname(__file__), '..', 'snowflake', '03_create_features.sql')
+
+def load_raw_csv(csv_path=DEFAULT_CSV_PATH):
+    """Read raw season data with the PLAYER_SEASON_DATA column types"""
+    return with_player_id(pd.read_csv(
+        csv_path,
+        dtype={'season': str, 'competition': str, 'club': str, 'ppg': 'float64', 'player_id': str}
+    ))
+
+def with_player_id(raw_df):
+    """Raw rows without a player_id column belong to the default (single) player, as in the table"""
+    if 'player_id' in raw_df.columns:
+        return raw_df
+    return raw_df.assign(player_id=DEFAULT_PLAYER_ID)
+
+def parse_season_start_year(season):
+    """Vectorized season -> start year: '11/12' -> 2011, '99/00' -> 1999, '2001' -> 2001"""
+    # Only a few hundred distinct seasons exist, so parse the uniques and map back
+    codes, uniques = pd.factorize(season.astype(str))
+    uniques = pd.Series(uniques)
+    is_split = uniques.str.contains('/', regex=False)
+    prefix = pd.to_numeric(uniques.str[:2], errors='coerce')
+    split_year = np.where(prefix < 50, prefix + 2000, prefix + 1900)
+    plain_year = pd.to_numeric(uniques, errors='coerce')
+    years = pd.array(np.where(is_split, split_year, plain_year), dtype='Int64')
+    return pd.Series(years.take(codes), index=season.index)
+
+def _ratio_to_partition_max(df, column):
+    """column / MAX(column) OVER (PARTITION BY player_id, competition, season), NULL when the max is 0"""
+    partition_max = df.groupby(PARTITION_COLUMNS, sort=False, dropna=False)[column].transform('max')
+    return df[column] * 1.0 / partition_max.where(partition_max != 0)
+
+def compute_features(raw_df):
+    """Compute the LITMANEN_FEATURES columns from raw season rows"""
+    raw_df = with_player_id(raw_df)
+    df = raw_df.loc[raw_df['minutes'].notna(), RAW_COLUMNS].copy()
+    df['appearance_ratio'] = _ratio_to_partition_max(df, 'appearances')
+    df['minutes_ratio'] = _ratio_to_partition_max(df, 'minutes')
+    df['season_start_year'] = parse_season_start_year(df['season'])
+    return df[FEATURE_COLUMNS].reset_index(drop=True)
+
+def load_local_features(csv_path=DEFAULT_CSV_PATH):
+    """Raw CSV -> feature frame ordered like pull_features()"""
+    features = compute_features(load_raw_csv(csv_path))
+    return features.sort_values('season_start_year', kind='stable').reset_index(drop=True)
+
+def _feature_view_select():
+    """SELECT statement of the LITMANEN_FEATURES view, pointed at a local table"""
+    with open(FEATURES_SQL_PATH, 'r', encoding='utf-8') as f:
+        sql = f.read()
+    match = re.search(r'LITMANEN_FEATURES AS\s+(SELECT.*?);', sql, re.S | re.I)
+    if match is None:
+        raise ValueError(f"Could not find the LITMANEN_FEATURES view in {FEATURES_SQL_PATH}")
+    return match.group(1).replace('LITMANEN.RAW.PLAYER_SEASON_DATA', 'player_season_data')
+
+def compute_features_sql(raw_df):
+    """Run the view SQL from 03_create_features.sql on an in-memory SQLite copy of raw_df"""
+    conn = sqlite3.connect(':memory:')
+    try:
+        with_player_id(raw_df)[RAW_COLUMNS].to_sql('player_season_data', conn, index=False)
+        result = pd.read_sql_query(_feature_view_select(), conn)
+    finally:
+        conn.close()
+    result.columns = [c.lower() for c in result.columns]
+    return result[FEATURE_COLUMNS]
+
+def check_parity(raw_df, atol=1e-9):
+    """Compare compute_features against the SQL view semantics; returns True if identical"""
+    sort_cols = ['player_id', 'season', 'competition', 'club']
+    local = compute_features(raw_df).sort_values(sort_cols).reset_index(drop=True)
+    sql = compute_features_sql(raw_df).sort_values(sort_cols).reset_index(drop=True)
+    
+    if len(local) != len(sql):
+        print(f"Row count mismatch: local {len(local)}, SQL {len(sql)}")
+        return False
+    
+    ok = True
+    for col in FEATURE_COLUMNS:
+        left, right = local[col], sql[col]
+        if col in ('player_id', 'season', 'competition', 'club'):
+            same = left.astype(str).equals(right.astype(str))
+        else:
+            left = left.astype('float64').to_numpy()
+            right = pd.to_numeric(right, errors='coerce').astype('float64').to_numpy()
+            same = np.allclose(left, right, atol=atol, equal_nan=True)
+        if not same:
+            print(f"Mismatch in column '{col}'")
+            ok = False
+    print(f"Parity check on {len(local)} rows: {'OK' if ok else 'FAILED'}")
+    return ok
+
+def synthetic_raw_data(n_rows, seed=42, n_players=1):
+    """Random raw season rows for benchmarking; n_players > 1 spreads them over synthetic players"""
+    rng = np.random.default_rng(seed)
+    years = rng.integers(1960, 2030, n_rows)
+    split = rng.random(n_rows) < 0.6
+    season = np.where(
+        split,
+        pd.Series(years % 100).map('{:02d}'.format) + '/' + pd.Series((years + 1) % 100).map('{:02d}'.format),
+        years.astype(str)
+    )
+    appearances = rng.integers(0, 40, n_rows)
+    df = pd.DataFrame({
+        'season': season,
+        'competition': rng.choice([f'Competition {i}' for i in range(50)], n_rows),
+        'club': rng.choice([f'Club {i}' for i in range(500)], n_rows),
+        'appearances': appearances,
+        'starts': (appearances * rng.random(n_rows)).astype(int),
+        'ppg': np.round(rng.random(n_rows) * 3, 2),
+        'minutes': appearances * rng.integers(0, 91, n_rows)
+    })
+    if n_players > 1:
+        df['player_id'] = rng.choice([f'player_{i:05d}' for i in range(n_players)], n_rows)
+    return with_player_id(df)
+
+def benchmark(n_rows=1_000_000, repeat=3):
+    """Time compute_features on a synthetic dataset"""
+    raw_df = synthetic_raw_data(n_rows)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compute_features(raw_df)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"compute_features on {n_rows:,} rows: best {best:.3f}s of {repeat} "
+          f"({n_rows / best:,.0f} rows/sec)")
+    return best
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compute LITMANEN_FEATURES locally")
+    parser.add_argument('csv_path', nargs='?', default=DEFAULT_CSV_PATH, help="Raw season CSV")
+    parser.add_argument('--output', help="Write features to this CSV (or .parquet) file")
+    parser.add_argument('--check-parity', action='store_true',
+                        help="Compare against the SQL view semantics (raw CSV and synthetic data)")
+    parser.add_argument('--benchmark', type=int, metavar='N_ROWS',
+                        help="Benchmark on N_ROWS synthetic rows")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.check_parity:
+        ok = check_parity(load_raw_csv(args.csv_path))
+        ok = check_parity(synthetic_raw_data(100_000)) and ok
+        ok = check_parity(synthetic_raw_data(100_000, n_players=50)) and ok
+        raise SystemExit(0 if ok else 1)
+    if args.benchmark:
+        benchmark(args.benchmark)
+    else:
+        features = load_local_features(args.csv_path)
+        if args.output and args.output.endswith('.parquet'):
+            features.to_parquet(args.output, index=False)
+            print(f"Wrote {len(features)} feature rows to {args.output}")
+        elif args.output:
+            features.to_csv(args.output, index=False)
+            print(f"Wrote {len(features)} feature rows to {args.output}")
+        else:
+            print(features.to_string(index=False))
@@ -0,0 +1,140 @@
+"""
+Incremental retraining - Step 42-43
+Updates a persisted model with only the seasons that arrived since it was last trained.
+Warm-start forests grow extra trees fitted on the new rows; estimators with partial_fit take
+a partial_fit pass. The training state (last trained season, feature statistics of the last
+full fit, update history) is kept in training_state.json inside the artifact directory.
+A drift check on the new rows decides when to fall back to a full refit instead.
+"""
+import glob
+import json
+import os
+from datetime import datetime, timezone
+import numpy as np
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.metrics import accuracy_score
+
+STATE_FILE = 'training_state.json'
+
+# Forests that can grow trees with warm_start
+FORESTS = (RandomForestClassifier, ExtraTreesClassifier)
+
+DEFAULT_TREES_PER_UPDATE = 20
+# A forest grown past this many trees is refitted from scratch
+DEFAULT_MAX_ESTIMATORS = 500
+# Largest shift of a feature mean, in standard deviations of the last full fit
+DEFAULT_DRIFT_THRESHOLD = 0.5
+# Largest drop of accuracy on the new rows below the last full fit's holdout accuracy
+DEFAULT_ACCURACY_TOLERANCE = 0.1
+
+# New rows are later seasons by construction, so their season is not a drift signal
+DRIFT_EXCLUDED_COLUMNS = {'season_start_year'}
+
+def _matrix(model, X):
+    """X as the model was fitted: a DataFrame if it saw feature names, else a NumPy array"""
+    return X if hasattr(model, 'feature_names_in_') else X.to_numpy()
+
+def new_state(model_name, feature_cols, X_train, y_train, last_season, metrics, player_id=None,
+              workload_window=None):
+    """Training state after a full fit; the drift reference is the full fit's training rows"""
+    # The tuple fetch path leaves NUMBER columns as Decimal objects
+    X_train = X_train.astype(float)
+    return {
+        'model_name': model_name,
+        'feature_columns': list(feature_cols),
+        'player_id': player_id,
+        'workload_window': workload_window,
+        'last_season_start_year': int(last_season),
+        'rows_trained': int(len(X_train)),
+        'reference': {
+            'mean': {c: float(X_train[c].mean()) for c in feature_cols},
+            'std': {c: float(X_train[c].std(ddof=0)) for c in feature_cols},
+            'label_rate': float(np.mean(y_train)),
+            'holdout_accuracy': metrics.get('holdout_accuracy'),
+        },
+        'full_fit_at': datetime.now(timezone.utc).isoformat(),
+        'updates': [],
+    }
+
+def save_state(artifact_dir, state):
+    """Write training_state.json next to the artifact's manifest"""
+    path = os.path.join(artifact_dir, STATE_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+def load_state(artifact_dir):
+    """The artifact's training state, or None if it has none"""
+    path = os.path.join(artifact_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def latest_artifact(pattern='ml/model_*'):
+    """Most recently trained artifact directory with a training state, or None"""
+    states = glob.glob(os.path.join(pattern, STATE_FILE))
+    if not states:
+        return None
+    return os.path.dirname(max(states, key=os.path.getmtime))
+
+def check_drift(state, model, X_new, y_new, threshold=DEFAULT_DRIFT_THRESHOLD,
+                tolerance=DEFAULT_ACCURACY_TOLERANCE):
+    """(reasons to refit from scratch instead of updating, the model's accuracy on the new rows)"""
+    reasons = []
+    reference = state['reference']
+    for c in state['feature_columns']:
+        if c in DRIFT_EXCLUDED_COLUMNS:
+            continue
+        # Constant reference features: any change at all is a shift
+        std = reference['std'][c] or 1e-9
+        shift = abs(float(X_new[c].astype(float).mean()) - reference['mean'][c]) / std
+        if shift > threshold:
+            reasons.append(f"{c} mean shifted by {shift:.2f} std")
+
+    holdout = reference.get('holdout_accuracy')
+    accuracy = accuracy_score(y_new, model.predict(_matrix(model, X_new)))
+    if holdout is not None and accuracy < holdout - tolerance:
+        reasons.append(f"accuracy on new rows {accuracy:.3f} vs holdout {holdout:.3f}")
+    return reasons, accuracy
+
+def update_blockers(model, y_new, max_estimators=DEFAULT_MAX_ESTIMATORS, trees_per_update=DEFAULT_TREES_PER_UPDATE):
+    """Reasons this model cannot take an incremental update on y_new (empty if it can)"""
+    if isinstance(model, FORESTS):
+        reasons = []
+        # New trees are fitted on the new rows alone and must predict the same classes as the old ones
+        missing = set(model.classes_) - set(np.unique(y_new))
+        if missing:
+            reasons.append(f"new rows have no examples of class {sorted(missing)}")
+        if model.n_estimators + trees_per_update > max_estimators:
+            reasons.append(f"forest would exceed {max_estimators} trees")
+        return reasons
+    if hasattr(model, 'partial_fit'):
+        return []
+    return [f"{type(model).__name__} supports neither warm-start trees nor partial_fit"]
+
+def update_model(model, X_new, y_new, trees_per_update=DEFAULT_TREES_PER_UPDATE):
+    """Add trees fitted on the new rows (forests) or take one partial_fit pass; returns what was done"""
+    if isinstance(model, FORESTS):
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + trees_per_update)
+        model.fit(_matrix(model, X_new), y_new)
+        return f"added {trees_per_update} trees ({model.n_estimators} total)"
+    model.partial_fit(_matrix(model, X_new), y_new, classes=model.classes_)
+    return f"partial_fit on {len(X_new)} rows"
+
+def record_update(state, X_new, y_new, action, accuracy_before, data_hash=None):
+    """Advance the state past the new rows and append the update to its history"""
+    state['last_season_start_year'] = int(X_new['season_start_year'].max())
+    state['rows_trained'] += int(len(X_new))
+    state['updates'].append({
+        'at': datetime.now(timezone.utc).isoformat(),
+        'rows': int(len(X_new)),
+        'last_season_start_year': state['last_season_start_year'],
+        'label_rate': float(np.mean(y_new)),
+        'accuracy_before_update': accuracy_before,
+        'action': action,
+        'training_data_hash': data_hash,
+    })
+    return state
@@ -0,0 +1,245 @@
+"""
+Run instrumentation for the training pipeline
+Records wall time, CPU time, peak RSS and row counts per stage, the query ID and timings of
+every warehouse query, and optionally profiles one stage (cProfile, or a low-overhead stack
+sampler in the style of py-spy). Reports are written as JSON or CSV.
+"""
+import cProfile
+import csv
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from readers import peak_rss_mb
+
+def current_rss_mb():
+    """Resident set size right now in MB (None where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return None
+
+class _Sampler:
+    """Background thread sampling RSS and, optionally, the main thread's stack"""
+
+    def __init__(self, interval=0.01, stacks=False):
+        self.interval = interval
+        self.stacks = Counter() if stacks else None
+        self.peak_rss = current_rss_mb()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='run-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss_mb()
+            if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+                self.peak_rss = rss
+            if self.stacks is not None:
+                frame = sys._current_frames().get(self._target)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+class RunProfiler:
+    """Per-stage and per-query measurements for one pipeline run
+
+    profile_stage names the stage to profile; profile_mode is 'cprofile' (deterministic,
+    higher overhead) or 'sample' (stack samples every 5 ms, written as collapsed stacks
+    that flamegraph.pl and speedscope read).
+    """
+
+    def __init__(self, profile_stage=None, profile_mode='cprofile', profile_dir='.'):
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.stages = []
+        self.queries = []
+        self.profile_stage = profile_stage
+        self.profile_mode = profile_mode
+        self.profile_dir = profile_dir
+        self.profile_path = None
+        self.profile_top = None
+        self._current = None
+
+    @contextmanager
+    def stage(self, name):
+        """with profiler.stage('pull') as s: ...; s['rows'] = len(df)"""
+        record = {'stage': name, 'rows': None, 'error': None}
+        self._current = name
+        profile = self.profile_stage == name
+        profiler = cProfile.Profile() if profile and self.profile_mode == 'cprofile' else None
+        sampler = _Sampler(0.005 if profile else 0.02, stacks=profile and self.profile_mode == 'sample')
+        rss_start = current_rss_mb()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            with sampler:
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    yield record
+                except BaseException as e:
+                    record['error'] = f"{type(e).__name__}: {e}"
+                    raise
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            record['rss_start_mb'] = rss_start
+            record['peak_rss_mb'] = sampler.peak_rss
+            record['process_peak_rss_mb'] = peak_rss_mb()
+            record['query_seconds'] = sum(q['execute_seconds'] + q['fetch_seconds']
+                                          for q in self.queries if q['stage'] == name)
+            self.stages.append(record)
+            self._current = None
+            if profile:
+                self._save_profile(name, profiler, sampler)
+
+    def _save_profile(self, name, profiler, sampler):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        if profiler is not None:
+            self.profile_path = os.path.join(self.profile_dir, f'profile_{name}.prof')
+            profiler.dump_stats(self.profile_path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(15)
+            self.profile_top = out.getvalue()
+        else:
+            self.profile_path = os.path.join(self.profile_dir, f'profile_{name}.collapsed')
+            with open(self.profile_path, 'w', encoding='utf-8') as f:
+                for stack, count in sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            leaves = Counter()
+            for stack, count in sampler.stacks.items():
+                leaves[stack.rsplit(';', 1)[-1]] += count
+            total = sum(leaves.values()) or 1
+            self.profile_top = '\n'.join(f"{count / total:6.1%}  {frame}" for frame, count in leaves.most_common(15))
+
+    def record_query(self, sql, query_id, execute_seconds):
+        """Add a query; fetch time and rows are filled in as its results are read"""
+        query = {
+            'stage': self._current,
+            'query_id': query_id,
+            'sql': ' '.join(sql.split())[:200],
+            'execute_seconds': execute_seconds,
+            'fetch_seconds': 0.0,
+            'rows': None,
+        }
+        self.queries.append(query)
+        return query
+
+    def report(self):
+        """The whole run as one dict"""
+        return {
+            'started_at': self.started_at,
+            'stages': self.stages,
+            'queries': self.queries,
+            'profile': {'stage': self.profile_stage, 'mode': self.profile_mode, 'path': self.profile_path},
+        }
+
+    def write(self, path):
+        """Write the report: .json for everything, .csv for stages (queries go to <name>_queries.csv)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not path.endswith('.csv'):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, indent=2)
+            return [path]
+        paths = [path]
+        _write_csv(path, self.stages)
+        if self.queries:
+            query_path = path[:-len('.csv')] + '_queries.csv'
+            _write_csv(query_path, self.queries)
+            paths.append(query_path)
+        return paths
+
+    def print_summary(self):
+        """Stage table, then the slowest queries"""
+        print(f"\n{'stage':<20} {'rows':>9} {'wall s':>8} {'cpu s':>8} {'query s':>8} {'peak RSS MB':>12}")
+        for s in self.stages:
+            rows = '' if s['rows'] is None else s['rows']
+            peak = f"{s['peak_rss_mb']:.0f}" if s['peak_rss_mb'] is not None else 'n/a'
+            print(f"{s['stage']:<20} {rows:>9} {s['wall_seconds']:>8.3f} {s['cpu_seconds']:>8.3f} "
+                  f"{s['query_seconds']:>8.3f} {peak:>12}{'  FAILED' if s['error'] else ''}")
+        for q in sorted(self.queries, key=lambda q: -(q['execute_seconds'] + q['fetch_seconds']))[:5]:
+            print(f"  query {q['query_id']} ({q['stage']}): execute {q['execute_seconds']:.3f}s, "
+                  f"fetch {q['fetch_seconds']:.3f}s, {q['rows'] if q['rows'] is not None else '?'} rows - {q['sql'][:60]}")
+        if self.profile_top:
+            print(f"\nProfile of stage '{self.profile_stage}' ({self.profile_mode}, full output: {self.profile_path}):")
+            print(self.profile_top)
+
+def _write_csv(path, records):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(records[0]))
+        writer.writeheader()
+        writer.writerows(records)
+
+class InstrumentedCursor:
+    """Cursor proxy that times execute() and the fetches that follow it"""
+
+    def __init__(self, cursor, profiler):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._query = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, sql, params=None):
+        start = time.perf_counter()
+        self._cursor.execute(sql, params)
+        elapsed = time.perf_counter() - start
+        # sfqid: the Snowflake query ID, to look the query up in QUERY_HISTORY
+        self._query = self._profiler.record_query(sql, getattr(self._cursor, 'sfqid', None), elapsed)
+        return self
+
+    def _fetched(self, start, rows):
+        if self._query is not None:
+            self._query['fetch_seconds'] += time.perf_counter() - start
+            self._query['rows'] = (self._query['rows'] or 0) + rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(start, 0 if row is None else 1)
+        return row
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetch_arrow_batches(self):
+        batches = iter(self._cursor.fetch_arrow_batches())
+        while True:
+            start = time.perf_counter()
+            table = next(batches, None)
+            if table is None:
+                self._fetched(start, 0)
+                return
+            self._fetched(start, table.num_rows)
+            yield table
+
+def instrument_cursor(cursor, profiler):
+    """Wrap cursor for profiler; unchanged when profiler is None"""
+    return cursor if profiler is None else InstrumentedCursor(cursor, profiler)
@@ -2,66 +2,273 @@
 Load CSV data into Snowflake table
 Step 23: Load CSV to table
 """
+import argparse
 import csv
+import hashlib
+import itertools
+import json
 import os
-from dotenv import load_dotenv
-from snowflake.connector import connect
-
-# Load environment variables
-load_dotenv()
-
-# Snowflake connection parameters
-conn_params = {
-    'account': os.getenv('SNOWFLAKE_ACCOUNT'),
-    'user': os.getenv('SNOWFLAKE_USER'),
-    'password': os.getenv('SNOWFLAKE_PASSWORD'),
-    'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE'),
-    'database': 'LITMANEN',
-    'schema': 'RAW',
-    'role': os.getenv('SNOWFLAKE_ROLE', 'ACCOUNTADMIN')
-}
-
-def load_csv_to_snowflake(csv_file_path):
+import tempfile
+import time
+from connections import get_pool
+from readers import COLUMNS, iter_chunks, parse_row, peak_rss_mb
+
+INSERT_SQL = """
+    INSERT INTO LITMANEN.RAW.PLAYER_SEASON_DATA 
+    (season, competition, club, appearances, starts, ppg, minutes, player_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# Natural key used by the incremental (MERGE) load
+KEY_COLUMNS = ['player_id', 'season', 'competition', 'club']
+
+BULK_STAGE = '@LITMANEN.RAW.STAGE_CSV/bulk'
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.dirname(__file__), 'load_manifest.json')
+
+INCREMENT_INSERT_SQL = """
+    INSERT INTO PLAYER_SEASON_DATA_INCREMENT
+    (season, competition, club, appearances, starts, ppg, minutes, player_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+MERGE_SQL = """
+    MERGE INTO LITMANEN.RAW.PLAYER_SEASON_DATA t
+    USING PLAYER_SEASON_DATA_INCREMENT s
+    ON t.player_id = s.player_id AND t.season = s.season
+        AND t.competition = s.competition AND t.club = s.club
+    WHEN MATCHED THEN UPDATE SET
+        appearances = s.appearances,
+        starts = s.starts,
+        ppg = s.ppg,
+        minutes = s.minutes
+    WHEN NOT MATCHED THEN INSERT (season, competition, club, appearances, starts, ppg, minutes, player_id)
+        VALUES (s.season, s.competition, s.club, s.appearances, s.starts, s.ppg, s.minutes, s.player_id)
+"""
+
+def read_column_batches(path, batch_size=DEFAULT_BATCH_SIZE):
+    """Parse a CSV, gzip CSV, Excel file or directory tree into typed column batches"""
+    return iter_chunks(path, batch_size)
+
+def batch_rows(batch):
+    """Turn a column batch back into row tuples"""
+    return list(zip(*(batch[col] for col in COLUMNS)))
+
+def row_key(row):
+    """Manifest key for a typed row: player_id|season|competition|club"""
+    return '|'.join(str(row[COLUMNS.index(col)]) for col in KEY_COLUMNS)
+
+def row_hash(row):
+    """Content hash of a typed row"""
+    return hashlib.sha1(repr(row).encode('utf-8')).hexdigest()
+
+def read_manifest(manifest_path=DEFAULT_MANIFEST_PATH):
+    """Read the {key: hash} manifest of rows already loaded"""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('rows', {})
+
+def write_manifest(rows, manifest_path=DEFAULT_MANIFEST_PATH):
+    """Persist the {key: hash} manifest atomically"""
+    tmp_path = f'{manifest_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'table': 'LITMANEN.RAW.PLAYER_SEASON_DATA', 'rows': rows}, f, indent=0, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def manifest_rows(rows, manifest=None):
+    """Add {key: hash} entries for typed rows to manifest (a new one by default)"""
+    manifest = {} if manifest is None else manifest
+    manifest.update({row_key(row): row_hash(row) for row in rows})
+    return manifest
+
+def _report_throughput(label, rows, elapsed):
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    peak = peak_rss_mb()
+    peak_text = f", peak RSS {peak:.0f} MB" if peak is not None else ""
+    print(f"{label}: {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec{peak_text})")
+
+def load_csv_to_snowflake(csv_file_path, manifest_path=DEFAULT_MANIFEST_PATH):
     """Load CSV data into Snowflake table"""
-    conn = connect(**conn_params)
+    conn = get_pool('RAW').acquire()
     cursor = conn.cursor()
     
     try:
-        # Clear existing data
-        cursor.execute("TRUNCATE TABLE LITMANEN.RAW.PLAYER_SEASON_DATA")
+        start = time.perf_counter()
+        rows = 0
+        loaded = {}
         
         # Read CSV and insert data
         with open(csv_file_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
-            for row in reader:
-                # Handle empty ppg values
-                ppg = row['ppg'] if row['ppg'] else None
-                
-                insert_sql = """
-                    INSERT INTO LITMANEN.RAW.PLAYER_SEASON_DATA 
-                    (season, competition, club, appearances, starts, ppg, minutes)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """
-                cursor.execute(insert_sql, (
-                    row['season'],
-                    row['competition'],
-                    row['club'],
-                    int(row['appearances']),
-                    int(row['starts']),
-                    float(ppg) if ppg else None,
-                    int(row['minutes'])
-                ))
+            # TRUNCATE commits on its own: only clear the table once there is a row to replace it with
+            first = next(reader, None)
+            if first is None:
+                print(f"Error loading data: no rows in {csv_file_path}, table left unchanged")
+                return
+            
+            # Clear existing data
+            cursor.execute("TRUNCATE TABLE LITMANEN.RAW.PLAYER_SEASON_DATA")
+            
+            for row in itertools.chain([first], reader):
+                values = parse_row(row)
+                cursor.execute(INSERT_SQL, values)
+                manifest_rows([values], loaded)
+                rows += 1
         
         conn.commit()
+        # The table now holds exactly these rows: the next incremental run only merges changes
+        write_manifest(loaded, manifest_path)
         print(f"Successfully loaded data from {csv_file_path}")
+        _report_throughput("Row-by-row load", rows, time.perf_counter() - start)
+        
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        get_pool('RAW').release(conn)
+
+def _write_batch_file(batch, directory, index):
+    """Write a column batch to a headerless CSV file for PUT"""
+    path = os.path.join(directory, f'batch_{index:06d}.csv')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        for row in batch_rows(batch):
+            writer.writerow(['' if value is None else value for value in row])
+    return path
+
+def load_csv_bulk(csv_file_path, method='executemany', batch_size=DEFAULT_BATCH_SIZE,
+                  manifest_path=DEFAULT_MANIFEST_PATH):
+    """Bulk load using executemany batches or staged PUT + COPY INTO
+
+    csv_file_path may be a CSV, gzip CSV or Excel file, or a directory tree of them;
+    rows are streamed in batches so memory stays bounded by batch_size.
+    """
+    if method not in ('executemany', 'copy'):
+        raise ValueError(f"Unknown bulk load method: {method}")
+    
+    conn = get_pool('RAW').acquire()
+    cursor = conn.cursor()
+    
+    try:
+        start = time.perf_counter()
+        rows = 0
+        loaded = {}
+        
+        # TRUNCATE commits on its own: only clear the table once there is a batch to replace it with
+        batches = read_column_batches(csv_file_path, batch_size)
+        first = next(batches, None)
+        if first is None:
+            print(f"Error loading data: no rows in {csv_file_path}, table left unchanged")
+            return
+        batches = itertools.chain([first], batches)
+        
+        # Clear existing data
+        cursor.execute("TRUNCATE TABLE LITMANEN.RAW.PLAYER_SEASON_DATA")
+        
+        if method == 'executemany':
+            for batch in batches:
+                batch_values = batch_rows(batch)
+                cursor.executemany(INSERT_SQL, batch_values)
+                manifest_rows(batch_values, loaded)
+                rows += len(batch['season'])
+        else:
+            # Same stage + COPY path as snowflake/02_load_data.sql
+            cursor.execute(f"REMOVE {BULK_STAGE}/")
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                for index, batch in enumerate(batches):
+                    path = _write_batch_file(batch, tmp_dir, index)
+                    manifest_rows(batch_rows(batch), loaded)
+                    cursor.execute(
+                        f"PUT 'file://{path}' {BULK_STAGE}/ AUTO_COMPRESS=TRUE OVERWRITE=TRUE"
+                    )
+                    os.remove(path)
+                    rows += len(batch['season'])
+            cursor.execute(f"""
+                COPY INTO LITMANEN.RAW.PLAYER_SEASON_DATA
+                FROM {BULK_STAGE}/
+                FILE_FORMAT = (TYPE = CSV FIELD_DELIMITER = ',' FIELD_OPTIONALLY_ENCLOSED_BY = '"' NULL_IF = (''))
+                PURGE = TRUE
+            """)
+        
+        conn.commit()
+        write_manifest(loaded, manifest_path)
+        print(f"Successfully bulk loaded data from {csv_file_path} ({method}, batch size {batch_size})")
+        _report_throughput(f"Bulk load ({method})", rows, time.perf_counter() - start)
+        
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        get_pool('RAW').release(conn)
+
+def load_csv_incremental(csv_file_path, manifest_path=DEFAULT_MANIFEST_PATH,
+                         batch_size=DEFAULT_BATCH_SIZE):
+    """Upsert only new or changed rows, keyed on (player_id, season, competition, club)"""
+    start = time.perf_counter()
+    manifest = read_manifest(manifest_path)
+    
+    # Later rows win if the file repeats a key
+    current = {}
+    for batch in read_column_batches(csv_file_path, batch_size):
+        for row in batch_rows(batch):
+            current[row_key(row)] = row
+    
+    changed = {key: row for key, row in current.items() if manifest.get(key) != row_hash(row)}
+    print(f"{len(current)} rows in file, {len(changed)} new or changed")
+    
+    if not changed:
+        print("Nothing to load - table is up to date")
+        return 0
+    
+    conn = get_pool('RAW').acquire()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            "CREATE OR REPLACE TEMPORARY TABLE PLAYER_SEASON_DATA_INCREMENT LIKE LITMANEN.RAW.PLAYER_SEASON_DATA"
+        )
+        rows = list(changed.values())
+        for i in range(0, len(rows), batch_size):
+            cursor.executemany(INCREMENT_INSERT_SQL, rows[i:i + batch_size])
+        cursor.execute(MERGE_SQL)
+        conn.commit()
+        
+        manifest_rows(changed.values(), manifest)
+        write_manifest(manifest, manifest_path)
+        print(f"Successfully merged {len(changed)} rows from {csv_file_path}")
+        _report_throughput("Incremental load", len(changed), time.perf_counter() - start)
+        return len(changed)
         
     except Exception as e:
         print(f"Error loading data: {e}")
         conn.rollback()
+        return 0
     finally:
         cursor.close()
-        conn.close()
+        get_pool('RAW').release(conn)
+
+def parse_args():
+    default_csv = os.path.join(os.path.dirname(__file__), '..', 'data', 'litmanen_career_dataset_full.csv')
+    parser = argparse.ArgumentParser(description="Load career CSV into LITMANEN.RAW.PLAYER_SEASON_DATA")
+    parser.add_argument('csv_path', nargs='?', default=default_csv,
+                        help="CSV, .csv.gz or .xlsx file, or a directory of them (bulk/incremental modes)")
+    parser.add_argument('--mode', choices=['row', 'executemany', 'copy', 'incremental'], default='row',
+                        help="row: one INSERT per row; executemany/copy: bulk load; "
+                             "incremental: MERGE only new or changed rows")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Rows per bulk batch")
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST_PATH,
+                        help="Manifest of already loaded rows (written by full loads, read by incremental mode)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    csv_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'litmanen_career_dataset_full.csv')
-    load_csv_to_snowflake(csv_path)
+    args = parse_args()
+    if args.mode == 'row':
+        load_csv_to_snowflake(args.csv_path, manifest_path=args.manifest)
+    elif args.mode == 'incremental':
+        load_csv_incremental(args.csv_path, manifest_path=args.manifest, batch_size=args.batch_size)
+    else:
+        load_csv_bulk(args.csv_path, method=args.mode, batch_size=args.batch_size, manifest_path=args.manifest)
@@ -0,0 +1,382 @@
+"""
+Embedded DuckDB stand-in for the LITMANEN Snowflake database
+Runs snowflake/01-03 and 08 (schema, stage load, feature views) against a local DuckDB file with a
+few dialect shims, and serves connector-compatible pools, so the loader, trainer and local
+app run offline with LITMANEN_BACKEND=duckdb.
+
+Usage: python ml/local_warehouse.py [--path ml/.local_warehouse/litmanen.duckdb] [--csv data.csv] [--reset]
+"""
+import argparse
+import glob
+import itertools
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+import duckdb
+
+SNOWFLAKE_DIR = os.path.join(os.path.dirname(__file__), '..', 'snowflake')
+SETUP_SCRIPTS = ['01_create_database_schema.sql', '02_load_data.sql', '03_create_features.sql',
+                 '08_create_workload_features.sql']
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'litmanen_career_dataset_full.csv')
+DEFAULT_PATH = os.getenv(
+    'LITMANEN_DUCKDB_PATH',
+    os.path.join(os.path.dirname(__file__), '.local_warehouse', 'litmanen.duckdb')
+)
+
+# Stand-in for LITMANEN.INFORMATION_SCHEMA.TABLES.LAST_ALTERED, which DuckDB does not track
+META_TABLE = 'LITMANEN.LOCAL_META.TABLES'
+
+WRITE_TARGET = re.compile(
+    r'^\s*(?:INSERT\s+INTO|COPY\s+INTO|MERGE\s+INTO|TRUNCATE\s+(?:TABLE\s+)?|DELETE\s+FROM|UPDATE'
+    r'|CREATE\s+(?:OR\s+REPLACE\s+)?TABLE)\s+([\w.]+)', re.I
+)
+INSERT_VALUES_SQL = re.compile(
+    r'^\s*INSERT\s+INTO\s+([\w.]+)\s*\(([^)]*)\)\s*VALUES\s*\((?:\s*%s\s*,?)+\)\s*$', re.I
+)
+STAGE_REF = re.compile(r'@([\w.]+)(/[^\s\')]*)?')
+PUT_SQL = re.compile(r"^\s*PUT\s+'?file://([^'\s]+)'?\s+(@\S+)", re.I)
+COPY_SQL = re.compile(
+    r'^\s*COPY\s+INTO\s+([\w.]+)\s*(\([^)]*\))?\s+FROM\s+'
+    r'(?:\(\s*SELECT\s+(.*?)\s+FROM\s+(@\S+?)\s*\)|(@\S+))\s*(.*)$', re.I | re.S
+)
+
+def split_statements(sql):
+    """Statements of a Snowflake script, comments removed"""
+    sql = re.sub(r'--[^\n]*', '', sql)
+    return [statement.strip() for statement in sql.split(';') if statement.strip()]
+
+def _file_format(options):
+    """read_csv arguments for a FILE_FORMAT = (TYPE = CSV ...) clause"""
+    def option(name, default):
+        match = re.search(rf"{name}\s*=\s*(?:'((?:[^']|'')*)'|(\w+))", options, re.I)
+        if match is None:
+            return default
+        return match.group(1) if match.group(1) is not None else match.group(2)
+
+    delimiter = option('FIELD_DELIMITER', ',').replace("''", "'")
+    quote = option('FIELD_OPTIONALLY_ENCLOSED_BY', '"').replace("''", "'")
+    skip = int(option('SKIP_HEADER', '0'))
+    return (f"header=false, skip={skip}, delim={_literal(delimiter)}, quote={_literal(quote)}, "
+            f"all_varchar=true")
+
+def _literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+class LocalWarehouse:
+    """One DuckDB database holding the LITMANEN catalog, plus a directory standing in for stages"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        if path == ':memory:':
+            self.stage_dir = tempfile.mkdtemp(prefix='litmanen_stages_')
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.stage_dir = os.path.join(os.path.dirname(os.path.abspath(path)), 'stages')
+        self.db = duckdb.connect()
+        self.db.execute(f"ATTACH IF NOT EXISTS {_literal(path)} AS LITMANEN")
+        self.db.execute("CREATE SCHEMA IF NOT EXISTS LITMANEN.LOCAL_META")
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} "
+                        "(TABLE_SCHEMA VARCHAR, TABLE_NAME VARCHAR, LAST_ALTERED TIMESTAMP)")
+        self.lock = threading.Lock()
+        self.meta_lock = threading.Lock()
+
+    def has_table(self, schema, table, db=None):
+        """True if LITMANEN.schema.table exists; db is the calling session's connection"""
+        return (db or self.db).execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE upper(database_name) = 'LITMANEN' "
+            "AND upper(schema_name) = ? AND upper(table_name) = ?", [schema.upper(), table.upper()]
+        ).fetchone()[0] > 0
+
+    def connect(self, schema='FEATURES'):
+        """New session on the warehouse, like snowflake.connector.connect(database='LITMANEN', schema=...)"""
+        return LocalConnection(self, schema)
+
+    def run_script(self, path, schema='RAW'):
+        """Execute every statement of a snowflake/*.sql script"""
+        with open(path, 'r', encoding='utf-8') as f:
+            statements = split_statements(f.read())
+        conn = self.connect(schema)
+        try:
+            cursor = conn.cursor()
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            conn.close()
+
+    def setup(self, csv_path=DEFAULT_CSV_PATH):
+        """Run snowflake/01-03 and 08: schemas and raw table, the stage load of csv_path, the feature views"""
+        timings = {}
+        for script in SETUP_SCRIPTS:
+            start = time.perf_counter()
+            if script.startswith('02'):
+                # The PUT the script's header comment asks for, under the file name it copies from
+                stage = self.stage_path('@LITMANEN.RAW.STAGE_CSV')
+                os.makedirs(stage, exist_ok=True)
+                shutil.copyfile(csv_path, os.path.join(stage, 'litmanen_career_dataset_full.csv'))
+            self.run_script(os.path.join(SNOWFLAKE_DIR, script))
+            timings[script] = time.perf_counter() - start
+        return timings
+
+    def ensure_setup(self, csv_path=DEFAULT_CSV_PATH):
+        """Run setup() once, on a database that does not have the raw table yet"""
+        with self.lock:
+            if not self.has_table('RAW', 'PLAYER_SEASON_DATA'):
+                self.setup(csv_path)
+                print(f"Initialized local DuckDB warehouse at {self.path} from {csv_path}")
+
+    def stage_path(self, reference):
+        """Local directory or file for @DB.SCHEMA.STAGE/path (unqualified stages live in RAW)"""
+        match = STAGE_REF.match(reference)
+        name = match.group(1).upper().split('.')
+        name = '.'.join(['LITMANEN', 'RAW'][:3 - len(name)] + name)
+        return os.path.join(self.stage_dir, name, *(match.group(2) or '').strip('/').split('/'))
+
+class LocalConnection:
+    """Connector-compatible session: cursor(), commit(), rollback(), close(), is_closed()"""
+
+    def __init__(self, warehouse, schema):
+        self.warehouse = warehouse
+        self.schema = schema.upper()
+        self.db = warehouse.db.cursor()
+        if self.db.execute("SELECT COUNT(*) FROM duckdb_schemas() WHERE upper(database_name) = 'LITMANEN' "
+                                "AND upper(schema_name) = ?", [self.schema]).fetchone()[0]:
+            self.db.execute(f"USE LITMANEN.{self.schema}")
+        self.written = set()
+        self.closed = False
+
+    def cursor(self):
+        return LocalCursor(self)
+
+    def record_write(self, name):
+        """Note a write to a table; flushed to LAST_ALTERED on commit or close"""
+        parts = name.upper().split('.')
+        self.written.add((self.schema if len(parts) == 1 else parts[-2], parts[-1]))
+
+    def _flush_writes(self):
+        # Sessions writing the same table would conflict on its META_TABLE row
+        with self.warehouse.meta_lock:
+            for schema, table in self.written:
+                if schema != 'LOCAL_META' and self.warehouse.has_table(schema, table, self.db):
+                    self.db.execute(f"DELETE FROM {META_TABLE} WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?",
+                                    [schema, table])
+                    self.db.execute(f"INSERT INTO {META_TABLE} VALUES (?, ?, now())", [schema, table])
+        self.written = set()
+
+    def commit(self):
+        self.db.commit()
+        self._flush_writes()
+
+    def rollback(self):
+        # Statements autocommit, as with the connector's default session
+        try:
+            self.db.rollback()
+        except duckdb.TransactionException:
+            pass
+
+    def close(self):
+        if not self.closed:
+            self._flush_writes()
+            self.db.close()
+            self.closed = True
+
+    def is_closed(self):
+        return self.closed
+
+class LocalCursor:
+    """Connector-compatible cursor over the session's DuckDB connection, translating Snowflake SQL"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.db = connection.db
+        self.description = None
+        self.sfqid = None
+        self._result = None
+        self._purge = []
+
+    def _translate(self, sql):
+        """Snowflake statement -> DuckDB statement, or None when it is handled here instead"""
+        s = sql.strip().rstrip(';')
+        upper = s.upper()
+        warehouse = self.connection.warehouse
+
+        if upper.startswith('CREATE DATABASE'):
+            return None  # The database is the attached DuckDB file
+        if re.match(r'CREATE\s+(OR\s+REPLACE\s+)?STAGE\b', upper):
+            name = re.search(r'STAGE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)', s, re.I).group(1)
+            os.makedirs(warehouse.stage_path('@' + name), exist_ok=True)
+            return None
+        if re.match(r'ALTER\s+TABLE\s+\S+\s+CLUSTER\s+BY', upper):
+            return None  # No micro-partitions to cluster
+        if upper.startswith('PUT '):
+            source, target = PUT_SQL.match(s).groups()
+            target_dir = warehouse.stage_path(target)
+            os.makedirs(target_dir, exist_ok=True)
+            shutil.copy(source, target_dir)
+            return None
+        if upper.startswith('REMOVE '):
+            target = warehouse.stage_path(s.split()[1])
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            elif os.path.exists(target):
+                os.remove(target)
+            return None
+        if upper.startswith('COPY INTO'):
+            return self._translate_copy(s)
+
+        s = re.sub(r'\bNUMBER\s*\(', 'DECIMAL(', s, flags=re.I)
+        s = re.sub(r'\)\s*CLUSTER\s+BY\s*\([^)]*\)\s*$', ')', s, flags=re.I)
+        s = re.sub(r'(CREATE\s+(?:OR\s+REPLACE\s+)?(?:TEMPORARY\s+)?TABLE\s+[\w.]+)\s+LIKE\s+([\w.]+)',
+                   r'\1 AS SELECT * FROM \2 LIMIT 0', s, flags=re.I)
+        return s.replace('LITMANEN.INFORMATION_SCHEMA.TABLES', META_TABLE)
+
+    def _translate_copy(self, s):
+        """COPY INTO table FROM @stage -> INSERT INTO table SELECT ... FROM read_csv(staged files)"""
+        table, columns, select, select_stage, stage, options = COPY_SQL.match(s).groups()
+        location = self.connection.warehouse.stage_path(select_stage or stage)
+        files = sorted(glob.glob(os.path.join(location, '**', '*'), recursive=True)) \
+            if os.path.isdir(location) else glob.glob(location)
+        files = [f for f in files if os.path.isfile(f)]
+        self._purge = files if re.search(r'PURGE\s*=\s*TRUE', options, re.I) else []
+        if not files:
+            return None
+        select = re.sub(r'\$(\d+)', lambda m: f'column{int(m.group(1)) - 1}', select or '*')
+        file_list = ', '.join("'" + f.replace("'", "''") + "'" for f in files)
+        return f"INSERT INTO {table} {columns or ''} SELECT {select} FROM read_csv([{file_list}], {_file_format(options)})"
+
+    def execute(self, sql, params=None):
+        self._purge = []
+        # Query ID in the place of the connector's Snowflake query ID
+        self.sfqid = f"duckdb-{next(_query_ids)}"
+        statement = self._translate(sql)
+        self.description = None
+        self._result = None
+        if statement is not None:
+            if params:
+                # Connector pyformat (%s) -> DuckDB positional placeholders
+                statement = statement.replace('%s', '?')
+            self._result = self.db.execute(statement, params or [])
+            self.description = self.db.description
+        for path in self._purge:
+            os.remove(path)
+        target = WRITE_TARGET.match(sql)
+        if target:
+            self.connection.record_write(target.group(1))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        statement = self._translate(sql)
+        insert = INSERT_VALUES_SQL.match(statement)
+        rows = list(seq_of_params)
+        if insert and rows:
+            # One columnar INSERT ... SELECT instead of a statement per row
+            import pyarrow as pa
+
+            table, columns = insert.groups()
+            names = [c.strip() for c in columns.split(',')]
+            batch = pa.table({name: list(values) for name, values in zip(names, zip(*rows))})
+            self.db.register('_executemany_batch', batch)
+            try:
+                self.db.execute(f"INSERT INTO {table} ({columns}) SELECT * FROM _executemany_batch")
+            finally:
+                self.db.unregister('_executemany_batch')
+        elif rows:
+            self.db.executemany(statement.replace('%s', '?'), rows)
+        target = WRITE_TARGET.match(sql)
+        if target:
+            self.connection.record_write(target.group(1))
+        return self
+
+    def fetchone(self):
+        return self._result.fetchone() if self._result is not None else None
+
+    def fetchall(self):
+        return self._result.fetchall() if self._result is not None else []
+
+    def fetch_arrow_batches(self, batch_size=100000):
+        """Arrow tables in batches, like the connector's fetch_arrow_batches()"""
+        import pyarrow as pa
+
+        if self._result is None:
+            return
+        for batch in self._result.to_arrow_reader(batch_size):
+            yield pa.Table.from_batches([batch])
+
+    def fetch_pandas_batches(self, batch_size=100000):
+        for table in self.fetch_arrow_batches(batch_size):
+            yield table.to_pandas()
+
+    def close(self):
+        self._result = None
+
+class LocalPool:
+    """Stand-in for connections.ConnectionPool: sessions on a shared LocalWarehouse"""
+
+    def __init__(self, schema='FEATURES', path=DEFAULT_PATH):
+        self.schema = schema
+        self.warehouse = get_warehouse(path)
+        self.stats = {'connects': 0}
+
+    def acquire(self, timeout=None):
+        self.stats['connects'] += 1
+        return self.warehouse.connect(self.schema)
+
+    def release(self, conn):
+        conn.close()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        pass
+
+    def summary(self):
+        return f"local DuckDB warehouse {self.warehouse.path}, {self.stats['connects']} sessions"
+
+_query_ids = itertools.count(1)
+
+_warehouses = {}
+_warehouses_lock = threading.Lock()
+
+def get_warehouse(path=DEFAULT_PATH):
+    """Process-wide warehouse per database file, set up from the career CSV on first use"""
+    with _warehouses_lock:
+        warehouse = _warehouses.get(path)
+        if warehouse is None:
+            warehouse = _warehouses[path] = LocalWarehouse(path)
+    warehouse.ensure_setup()
+    return warehouse
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the local DuckDB warehouse from snowflake/01-03 and 08")
+    parser.add_argument('--path', default=DEFAULT_PATH, help="DuckDB database file (':memory:' for a dry run)")
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH, help="Raw career CSV to stage and load")
+    parser.add_argument('--reset', action='store_true', help="Rebuild even if the database already exists")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.reset and args.path != ':memory:' and os.path.exists(args.path):
+        os.remove(args.path)
+    warehouse = LocalWarehouse(args.path)
+    for script, seconds in warehouse.setup(args.csv).items():
+        print(f"  {script:<32} {seconds * 1000:>8.1f} ms")
+    conn = warehouse.connect('FEATURES')
+    cursor = conn.cursor()
+    for relation in ('LITMANEN.RAW.PLAYER_SEASON_DATA', 'LITMANEN.FEATURES.LITMANEN_FEATURES'):
+        start = time.perf_counter()
+        count = cursor.execute(f"SELECT COUNT(*) FROM {relation}").fetchone()[0]
+        print(f"{relation}: {count} rows ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    conn.close()
+    print(f"Local warehouse ready at {args.path}; use it with LITMANEN_BACKEND=duckdb")
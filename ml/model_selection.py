@@ -0,0 +1,129 @@
+"""
+Cross-validated model selection - Step 42 (CV variant)
+Evaluates candidate models and hyperparameter grids with k-fold or time-series CV,
+running every (candidate, params, fold) fit concurrently on a joblib process pool.
+"""
+import os
+import tempfile
+import time
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, TimeSeriesSplit
+
+# name -> (base estimator, hyperparameter grid)
+CANDIDATE_MODELS = {
+    'RandomForest': (
+        RandomForestClassifier(random_state=42),
+        {'n_estimators': [100, 300], 'max_depth': [3, 5, None]}
+    ),
+    'LogisticRegression': (
+        LogisticRegression(random_state=42, max_iter=1000),
+        {'C': [0.1, 1.0, 10.0]}
+    ),
+    'GradientBoosting': (
+        GradientBoostingClassifier(random_state=42),
+        {'n_estimators': [100, 200], 'max_depth': [2, 3]}
+    )
+}
+
+def make_folds(X, y, cv='kfold', n_splits=5, order=None):
+    """List of (train_idx, test_idx); cv='timeseries' splits in the given row order"""
+    if cv == 'timeseries':
+        order = np.arange(len(X)) if order is None else np.asarray(order)
+        return [(order[train], order[test]) for train, test in TimeSeriesSplit(n_splits=n_splits).split(order)]
+    if cv == 'kfold':
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+        return list(splitter.split(X, y))
+    raise ValueError(f"Unknown CV strategy: {cv}")
+
+def _fit_fold(name, estimator, params, X, y, train_idx, test_idx):
+    """Worker: fit one candidate on one fold and return its accuracy and fit-and-score seconds"""
+    start = time.perf_counter()
+    if len(np.unique(y[train_idx])) < 2:
+        # Early time-series folds can contain a single class; they do not count toward the mean
+        return name, tuple(sorted(params.items())), float('nan'), 0.0
+    model = clone(estimator).set_params(**params)
+    model.fit(X[train_idx], y[train_idx])
+    score = accuracy_score(y[test_idx], model.predict(X[test_idx]))
+    return name, tuple(sorted(params.items())), score, time.perf_counter() - start
+
+def _shared_arrays(X, y, folder):
+    """Dump X and y once and reopen them memory-mapped, so workers share one read-only copy"""
+    x_path = os.path.join(folder, 'X.mmap')
+    y_path = os.path.join(folder, 'y.mmap')
+    joblib.dump(np.ascontiguousarray(X, dtype=np.float64), x_path)
+    joblib.dump(np.asarray(y), y_path)
+    return joblib.load(x_path, mmap_mode='r'), joblib.load(y_path, mmap_mode='r')
+
+def run_cv(X, y, folds, candidates=None, n_jobs=-1):
+    """Run every (candidate, params, fold) task; returns list of task results and wall time"""
+    candidates = candidates or CANDIDATE_MODELS
+    tasks = [
+        (name, estimator, params)
+        for name, (estimator, grid) in candidates.items()
+        for params in ParameterGrid(grid)
+    ]
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='litmanen_cv_') as folder:
+        X_shared, y_shared = _shared_arrays(X, y, folder)
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_fold)(name, estimator, params, X_shared, y_shared, train_idx, test_idx)
+            for name, estimator, params in tasks
+            for train_idx, test_idx in folds
+        )
+    return results, time.perf_counter() - start
+
+def summarize(results):
+    """Mean/std CV accuracy and total fit seconds over the folds per (candidate, params), best first"""
+    scores = {}
+    fit_seconds = {}
+    for name, params, score, seconds in results:
+        scores.setdefault((name, params), []).append(score)
+        fit_seconds[(name, params)] = fit_seconds.get((name, params), 0.0) + seconds
+    summary = []
+    for (name, params), s in scores.items():
+        s = np.asarray(s, dtype=np.float64)
+        s = s[~np.isnan(s)]
+        summary.append({
+            'model': name,
+            'params': dict(params),
+            'mean_score': float(s.mean()) if len(s) else float('-inf'),
+            'std_score': float(s.std()) if len(s) else float('nan'),
+            'fit_seconds': fit_seconds[(name, params)]
+        })
+    return sorted(summary, key=lambda r: r['mean_score'], reverse=True)
+
+def select_model_cv(X, y, cv='kfold', n_splits=5, n_jobs=-1, order=None, measure_speedup=False,
+                    candidates=None):
+    """Pick the best candidate by mean CV accuracy and refit it on all of X, y"""
+    candidates = candidates or CANDIDATE_MODELS
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    folds = make_folds(X, y, cv, n_splits, order)
+    n_fits = sum(len(ParameterGrid(grid)) for _, grid in candidates.values()) * len(folds)
+    print(f"\nStep 42: Cross-validating {len(candidates)} models, {n_fits} fits "
+          f"({cv}, {len(folds)} folds, n_jobs={n_jobs})...")
+    
+    results, parallel_seconds = run_cv(X, y, folds, candidates, n_jobs)
+    print(f"Parallel CV wall time: {parallel_seconds:.2f}s")
+    if measure_speedup:
+        _, serial_seconds = run_cv(X, y, folds, candidates, n_jobs=1)
+        print(f"Serial CV wall time: {serial_seconds:.2f}s "
+              f"(speedup {serial_seconds / parallel_seconds:.1f}x)")
+    
+    summary = summarize(results)
+    print(f"\n{'model':<20} {'mean':>6} {'std':>6} {'fit s':>7}  params")
+    for row in summary:
+        print(f"{row['model']:<20} {row['mean_score']:>6.3f} {row['std_score']:>6.3f} "
+              f"{row['fit_seconds']:>7.2f}  {row['params']}")
+    
+    best = summary[0]
+    model = clone(candidates[best['model']][0]).set_params(**best['params'])
+    model.fit(X, y)
+    print(f"\nBest model: {best['model']} {best['params']} (mean CV accuracy {best['mean_score']:.3f})")
+    return model, best['model'], summary
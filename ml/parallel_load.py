@@ -0,0 +1,170 @@
+"""
+Parallel multi-file ingest into Snowflake
+Worker processes parse and validate files concurrently; a small pool of
+Snowflake connections uploads the resulting batches.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from connections import create_pool
+from load_data import (INSERT_SQL, DEFAULT_BATCH_SIZE, DEFAULT_MANIFEST_PATH, manifest_rows, read_manifest,
+                       write_manifest)
+from readers import iter_rows, iter_source_files, parse_row, peak_rss_mb
+
+def validate_row(row):
+    """Return a reason string if a typed row is invalid, else None"""
+    season, competition, club, appearances, starts, ppg, minutes, player_id = row
+    if not season or not competition or not club or not player_id:
+        return "missing season/competition/club/player_id"
+    if appearances < 0 or starts < 0 or minutes < 0:
+        return "negative count"
+    if ppg is not None and not 0 <= ppg <= 3:
+        return "ppg out of range"
+    return None
+
+def parse_file(path, batch_size=DEFAULT_BATCH_SIZE):
+    """Worker: parse and validate one file into batches of typed row tuples"""
+    start = time.perf_counter()
+    batches = []
+    batch = []
+    invalid = 0
+    for raw in iter_rows(path):
+        try:
+            row = parse_row(raw)
+        except (KeyError, TypeError, ValueError):
+            invalid += 1
+            continue
+        if validate_row(row):
+            invalid += 1
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+    return {
+        'path': path,
+        'batches': batches,
+        'rows': sum(len(b) for b in batches),
+        'invalid': invalid,
+        'parse_seconds': time.perf_counter() - start
+    }
+
+def upload_batches(pool, batches):
+    """Upload batches on a connection borrowed from the pool; returns elapsed seconds"""
+    start = time.perf_counter()
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for batch in batches:
+                cursor.executemany(INSERT_SQL, batch)
+            conn.commit()
+        finally:
+            cursor.close()
+    return time.perf_counter() - start
+
+def print_report(results, elapsed):
+    """Per-file timing report and overall throughput"""
+    print(f"\n{'file':<50} {'rows':>9} {'invalid':>8} {'parse s':>8} {'upload s':>9}")
+    for r in sorted(results, key=lambda r: r['path']):
+        name = os.path.relpath(r['path'])
+        if len(name) > 50:
+            name = '...' + name[-47:]
+        parse = f"{r['parse_seconds']:.2f}" if r['parse_seconds'] is not None else 'failed'
+        upload = f"{r['upload_seconds']:.2f}" if r.get('upload_seconds') is not None else 'failed'
+        print(f"{name:<50} {r['rows']:>9} {r['invalid']:>8} {parse:>8} {upload:>9}")
+    total_rows = sum(r['rows'] for r in results)
+    rate = total_rows / elapsed if elapsed > 0 else float('inf')
+    peak = peak_rss_mb()
+    peak_text = f", peak RSS {peak:.0f} MB (parent)" if peak is not None else ""
+    print(f"\nParallel load: {total_rows} rows from {len(results)} files "
+          f"in {elapsed:.2f}s ({rate:,.0f} rows/sec{peak_text})")
+
+def load_parallel(path, workers=None, upload_connections=4, batch_size=DEFAULT_BATCH_SIZE,
+                  truncate=True, manifest_path=DEFAULT_MANIFEST_PATH):
+    """Parse files under path on a process pool and upload them over a connection pool
+
+    The rows of every uploaded file are added to the incremental-load manifest (which starts
+    empty after the TRUNCATE), so load_data.py --mode incremental only merges later changes.
+    """
+    files = list(iter_source_files(path))
+    if not files:
+        print(f"No data files found under {path}")
+        return []
+    workers = workers or os.cpu_count() or 1
+    print(f"Loading {len(files)} files with {workers} parse workers "
+          f"and {upload_connections} Snowflake connections")
+    
+    start = time.perf_counter()
+    pool = create_pool('RAW', max_size=upload_connections)
+    
+    results = []
+    manifest = {} if truncate else read_manifest(manifest_path)
+    try:
+        if truncate:
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("TRUNCATE TABLE LITMANEN.RAW.PLAYER_SEASON_DATA")
+                finally:
+                    cursor.close()
+        
+        with ProcessPoolExecutor(max_workers=workers) as parsers, \
+                ThreadPoolExecutor(max_workers=upload_connections) as uploaders:
+            parse_futures = {parsers.submit(parse_file, f, batch_size): f for f in files}
+            uploads = {}
+            for future in as_completed(parse_futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error parsing {parse_futures[future]}: {e}")
+                    results.append({'path': parse_futures[future], 'rows': 0, 'invalid': 0,
+                                    'parse_seconds': None, 'upload_seconds': None})
+                    continue
+                batches = result.pop('batches')
+                uploads[uploaders.submit(upload_batches, pool, batches)] = (result, batches)
+            for future in as_completed(uploads):
+                result, batches = uploads[future]
+                try:
+                    result['upload_seconds'] = future.result()
+                    for batch in batches:
+                        manifest_rows(batch, manifest)
+                except Exception as e:
+                    print(f"Error uploading {result['path']}: {e}")
+                    result['upload_seconds'] = None
+                results.append(result)
+    finally:
+        pool.close_all()
+        write_manifest(manifest, manifest_path)
+    
+    print_report(results, time.perf_counter() - start)
+    print(f"Snowflake connections: {pool.summary()}")
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Parallel multi-file ingest into LITMANEN.RAW.PLAYER_SEASON_DATA")
+    parser.add_argument('path', help="CSV, .csv.gz or .xlsx file, or a directory of them")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Parse worker processes (default: CPU count)")
+    parser.add_argument('--upload-connections', type=int, default=4,
+                        help="Snowflake connections used for uploads")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Rows per executemany batch")
+    parser.add_argument('--append', action='store_true',
+                        help="Append instead of truncating the table first")
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST_PATH,
+                        help="Incremental-load manifest to record the loaded rows in")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    load_parallel(
+        args.path,
+        workers=args.workers,
+        upload_connections=args.upload_connections,
+        batch_size=args.batch_size,
+        truncate=not args.append,
+        manifest_path=args.manifest
+    )
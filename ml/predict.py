@@ -0,0 +1,327 @@
+"""
+Availability model scoring
+Batch scoring of feature tables/Parquet files and a lightweight HTTP/JSON endpoint
+for the model persisted by train_model.persist_model (Step 43).
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from artifacts import check_feature_schema, load_model
+
+KEY_COLUMNS = ['player_id', 'season', 'competition', 'club']
+PREDICTIONS_TABLE = 'AVAILABILITY_PREDICTIONS'
+
+def score_frame(model_data, df):
+    """Predictions for a feature frame, with the key columns carried through"""
+    feature_cols = model_data['feature_columns']
+    model = model_data['model']
+    if 'manifest' in model_data:
+        check_feature_schema(model_data['manifest'], df.columns)
+    X = df[feature_cols].fillna(0).astype(np.float64)
+    if not hasattr(model, 'feature_names_in_'):
+        # Fitted on a plain array (e.g. by model_selection); match that to avoid name warnings
+        X = X.to_numpy()
+    result = df[[c for c in KEY_COLUMNS if c in df.columns]].copy()
+    result['prediction'] = model.predict(X)
+    if hasattr(model, 'predict_proba'):
+        proba = model.predict_proba(X)
+        result['probability'] = proba[:, 1] if proba.shape[1] > 1 else 0.0
+    result['model_name'] = model_data['model_name']
+    return result
+
+def latest_model_path():
+    """The most recently trained artifact under ml/model_* (None if there is none)"""
+    # Deferred: the in-warehouse UDF imports this module without incremental.py
+    from incremental import latest_artifact
+    
+    return latest_artifact()
+
+def iter_parquet_chunks(path, chunk_size):
+    """Read a Parquet file in record-batch chunks"""
+    import pyarrow.parquet as pq
+    
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+def iter_snowflake_chunks(cursor, relation, player_id=None):
+    """Read a feature table/view (optionally one player's rows) in the connector's result batches"""
+    if player_id is None:
+        cursor.execute(f"SELECT * FROM {relation}")
+    else:
+        cursor.execute(f"SELECT * FROM {relation} WHERE player_id = %s", (player_id,))
+    for chunk in cursor.fetch_pandas_batches():
+        chunk.columns = [c.lower() for c in chunk.columns]
+        yield chunk
+
+def score_batches(model_data, chunks, write_chunk):
+    """Score each chunk and hand it to write_chunk(frame, first); returns rows scored"""
+    start = time.perf_counter()
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        scored = score_frame(model_data, chunk)
+        write_chunk(scored, i == 0)
+        rows += len(scored)
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    print(f"Scored {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    return rows
+
+def batch_score_parquet(model_data, input_path, output_path, chunk_size=50000):
+    """Batch mode: Parquet features in, Parquet predictions out"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    writer = None
+    
+    def write_chunk(scored, first):
+        nonlocal writer
+        table = pa.Table.from_pandas(scored, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, table.schema)
+        writer.write_table(table)
+    
+    try:
+        rows = score_batches(model_data, iter_parquet_chunks(input_path, chunk_size), write_chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    print(f"Predictions written to: {output_path}")
+    return rows
+
+def batch_score_snowflake(model_data, relation, player_id=None):
+    """Batch mode: read features from Snowflake, write predictions back to AVAILABILITY_PREDICTIONS
+
+    With player_id only that player's rows are scored, and only that player's previous
+    predictions are replaced (the table must already exist from a full run).
+    """
+    from snowflake.connector.pandas_tools import write_pandas
+    from connections import get_pool
+    
+    # Reads stream on one session while writes go through a second one
+    pool = get_pool('FEATURES')
+    with pool.connection() as read_conn, pool.connection() as write_conn:
+        read_cursor = read_conn.cursor()
+        
+        if player_id is not None:
+            delete_cursor = write_conn.cursor()
+            try:
+                delete_cursor.execute(
+                    f"DELETE FROM LITMANEN.FEATURES.{PREDICTIONS_TABLE} WHERE player_id = %s", (player_id,)
+                )
+            finally:
+                delete_cursor.close()
+        
+        def write_chunk(scored, first):
+            scored = scored.copy()
+            scored.columns = [c.upper() for c in scored.columns]
+            write_pandas(write_conn, scored, PREDICTIONS_TABLE, database='LITMANEN', schema='FEATURES',
+                         auto_create_table=True, overwrite=first and player_id is None,
+                         quote_identifiers=False)
+        
+        try:
+            chunks = iter_snowflake_chunks(read_cursor, relation, player_id)
+            rows = score_batches(model_data, chunks, write_chunk)
+            print(f"Predictions written to: LITMANEN.FEATURES.{PREDICTIONS_TABLE}")
+            return rows
+        finally:
+            read_cursor.close()
+
+class LatencyStats:
+    """Rolling request latency and throughput counters"""
+    
+    def __init__(self, window=10000):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+    
+    def record(self, seconds, rows):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.requests += 1
+            self.rows += rows
+    
+    def snapshot(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            uptime = time.perf_counter() - self.started
+            return {
+                'requests': self.requests,
+                'rows': self.rows,
+                'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+                'requests_per_sec': self.requests / uptime if uptime > 0 else 0.0,
+                'rows_per_sec': self.rows / uptime if uptime > 0 else 0.0
+            }
+
+class MicroBatcher:
+    """Collects concurrent requests for up to max_wait_ms and scores them in one model call"""
+    
+    def __init__(self, model_data, max_batch_rows=512, max_wait_ms=5):
+        self.model_data = model_data
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+    
+    def predict(self, frame):
+        """Blocking: score frame as part of the next micro-batch"""
+        item = {'frame': frame, 'done': threading.Event(), 'result': None, 'error': None}
+        self.queue.put(item)
+        item['done'].wait()
+        if item['error'] is not None:
+            raise item['error']
+        return item['result']
+    
+    def _collect(self):
+        items = [self.queue.get()]
+        rows = len(items[0]['frame'])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_rows:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            items.append(item)
+            rows += len(item['frame'])
+        return items
+    
+    def _run(self):
+        while True:
+            items = self._collect()
+            try:
+                scored = score_frame(self.model_data, pd.concat([i['frame'] for i in items], ignore_index=True))
+                offset = 0
+                for item in items:
+                    n = len(item['frame'])
+                    item['result'] = scored.iloc[offset:offset + n]
+                    offset += n
+            except Exception:
+                # One bad request must not fail the rest of the batch: score each on its own
+                for item in items:
+                    try:
+                        item['result'] = score_frame(self.model_data, item['frame'])
+                    except Exception as e:
+                        item['error'] = e
+            for item in items:
+                item['done'].set()
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """POST /predict {"rows": [{feature: value, ...}, ...]}; GET /stats; GET /health"""
+    
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok', 'model_name': self.server.batcher.model_data['model_name']})
+        elif self.path == '/stats':
+            self._send_json(200, self.server.stats.snapshot())
+        else:
+            self._send_json(404, {'error': 'not found'})
+    
+    def do_POST(self):
+        if self.path != '/predict':
+            self._send_json(404, {'error': 'not found'})
+            return
+        start = time.perf_counter()
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            rows = payload['rows'] if isinstance(payload, dict) and 'rows' in payload else payload
+            if isinstance(rows, dict):
+                rows = [rows]
+            frame = pd.DataFrame(rows)
+            feature_cols = self.server.batcher.model_data['feature_columns']
+            missing = [c for c in feature_cols if c not in frame.columns]
+            if missing:
+                self._send_json(400, {'error': f"missing feature columns: {missing}"})
+                return
+            # Reject non-numeric values here, before the request joins a micro-batch
+            for c in feature_cols:
+                frame[c] = pd.to_numeric(frame[c])
+            scored = self.server.batcher.predict(frame)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(200, {'predictions': json.loads(scored.to_json(orient='records'))})
+        self.server.stats.record(time.perf_counter() - start, len(frame))
+    
+    def log_message(self, format, *args):
+        # Per-request logging would dominate latency; /stats has the numbers
+        pass
+
+def serve(model_data, host='127.0.0.1', port=8080, max_batch_rows=512, max_wait_ms=5, report_every=30):
+    """Run the scoring endpoint; the model is loaded once and shared by all requests"""
+    server = ThreadingHTTPServer((host, port), PredictionHandler)
+    server.batcher = MicroBatcher(model_data, max_batch_rows, max_wait_ms)
+    server.stats = LatencyStats()
+    
+    def report():
+        while True:
+            time.sleep(report_every)
+            stats = server.stats.snapshot()
+            if stats['requests']:
+                print(f"requests={stats['requests']} p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms "
+                      f"throughput={stats['rows_per_sec']:,.0f} rows/sec")
+    
+    threading.Thread(target=report, daemon=True).start()
+    print(f"Serving {model_data['model_name']} on http://{host}:{port}/predict")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score the persisted availability model")
+    parser.add_argument('--model',
+                        help="Model artifact directory (or legacy .pkl) written by train_model.py "
+                             "(default: the most recently trained ml/model_* artifact)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    batch = subparsers.add_parser('batch', help="Batch scoring")
+    batch.add_argument('--input', help="Parquet file of features (default: read from Snowflake)")
+    batch.add_argument('--output', default='ml/predictions.parquet', help="Parquet output for --input")
+    batch.add_argument('--relation', default='LITMANEN.FEATURES.LITMANEN_FEATURES',
+                       help="Snowflake features table/view to score")
+    batch.add_argument('--chunk-size', type=int, default=50000, help="Rows per Parquet chunk")
+    batch.add_argument('--player', metavar='PLAYER_ID',
+                       help="Score only this player's rows from Snowflake")
+    
+    server = subparsers.add_parser('serve', help="HTTP/JSON scoring endpoint")
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=8080)
+    server.add_argument('--max-batch-rows', type=int, default=512, help="Rows per micro-batch")
+    server.add_argument('--max-wait-ms', type=float, default=5, help="Micro-batch collection window")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    model_path = args.model or latest_model_path()
+    if model_path is None:
+        raise SystemExit("No trained model under ml/model_*: run train_model.py or pass --model")
+    print(f"Scoring with {model_path}")
+    model_data = load_model(model_path)
+    if args.command == 'batch':
+        if args.input:
+            batch_score_parquet(model_data, args.input, args.output, args.chunk_size)
+        else:
+            batch_score_snowflake(model_data, args.relation, args.player)
+    else:
+        serve(model_data, args.host, args.port, args.max_batch_rows, args.max_wait_ms)
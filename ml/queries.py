@@ -0,0 +1,126 @@
+"""
+SQL builders for feature reads
+Turn dashboard/pipeline selections into parameterized queries so filtering happens in
+Snowflake and only the needed rows cross the wire.
+"""
+
+FEATURE_SELECT_COLUMNS = [
+    'player_id', 'season', 'club', 'competition', 'appearances', 'starts', 'ppg', 'minutes',
+    'appearance_ratio', 'minutes_ratio', 'season_start_year'
+]
+
+def _where_clause(club=None, competition=None, year_min=None, year_max=None, player_id=None, alias=''):
+    """WHERE clause and params for the dashboard filters ('All' means no filter); alias qualifies the columns"""
+    prefix = f"{alias}." if alias else ''
+    conditions = []
+    params = []
+    # Leading clustering key of the feature table and rollup, so player scopes prune micro-partitions
+    if player_id not in (None, 'All'):
+        conditions.append(f"{prefix}player_id = %s")
+        params.append(player_id)
+    if club not in (None, 'All'):
+        conditions.append(f"{prefix}club = %s")
+        params.append(club)
+    if competition not in (None, 'All'):
+        conditions.append(f"{prefix}competition = %s")
+        params.append(competition)
+    if year_min is not None:
+        conditions.append(f"{prefix}season_start_year >= %s")
+        params.append(int(year_min))
+    if year_max is not None:
+        conditions.append(f"{prefix}season_start_year <= %s")
+        params.append(int(year_max))
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+def build_features_query(relation, club=None, competition=None, year_min=None, year_max=None, player_id=None):
+    """SELECT of the feature columns with optional filters; returns (sql, params) for %s binding"""
+    where, params = _where_clause(club, competition, year_min, year_max, player_id)
+    sql = f"SELECT {', '.join(FEATURE_SELECT_COLUMNS)} FROM {relation}{where} ORDER BY season_start_year"
+    return sql, params
+
+def build_rollup_query(relation, group_col, club=None, competition=None, year_min=None, year_max=None,
+                       player_id=None):
+    """Re-aggregate FEATURE_ROLLUP (snowflake/07_create_rollups.sql) by player, club, competition or season"""
+    if group_col not in ('player_id', 'club', 'competition', 'season_start_year'):
+        raise ValueError(f"Unsupported rollup dimension: {group_col}")
+    where, params = _where_clause(club, competition, year_min, year_max, player_id)
+    sql = (
+        f"SELECT {group_col}, "
+        f"SUM(appearances) AS appearances, "
+        f"SUM(minutes) AS minutes, "
+        f"SUM(ppg_sum) / NULLIF(SUM(ppg_count), 0) AS ppg, "
+        f"SUM(minutes_ratio_sum) / NULLIF(SUM(minutes_ratio_count), 0) AS minutes_ratio "
+        f"FROM {relation}{where} GROUP BY {group_col}"
+    )
+    return sql, params
+
+def build_filter_options_query(relation):
+    """Small query behind the sidebar: one row per (player, club, competition) with its year span"""
+    return (
+        f"SELECT player_id, club, competition, MIN(season_start_year) AS min_year, MAX(season_start_year) AS max_year "
+        f"FROM {relation} GROUP BY player_id, club, competition"
+    )
+
+WORKLOAD_COLUMNS = [
+    'prev_season_minutes', 'rolling_minutes', 'load_spike', 'start_ratio_trend', 'new_club', 'multi_club_season'
+]
+
+def build_workload_query(relation, window=3, year_min=None, player_id=None, order_by=True):
+    """Feature rows plus WORKLOAD_COLUMNS from player-season windows; returns (sql, params) for %s binding
+
+    Workload columns look back `window` seasons (snowflake/08_create_workload_features.sql is this
+    query with window=3 and order_by=False, as a view does not keep row order). With year_min only seasons from year_min on are returned, and only
+    the `window` seasons before it are read as history, so a pull stays proportional to
+    window + new seasons rather than to the whole table.
+    """
+    window = int(window)
+    # History needs `window` earlier seasons; at least one for the previous-season columns
+    lookback_min = None if year_min is None else int(year_min) - max(window, 1)
+    history, history_params = _where_clause(year_min=lookback_min, player_id=player_id)
+    where, params = _where_clause(year_min=year_min, player_id=player_id, alias='f')
+    frame = (f"OVER (PARTITION BY player_id ORDER BY season_start_year "
+             f"RANGE BETWEEN {window} PRECEDING AND 1 PRECEDING)")
+    previous = "OVER (PARTITION BY player_id ORDER BY season_start_year)"
+    sql = f"""
+WITH history AS (
+  SELECT * FROM {relation}{history}
+),
+player_seasons AS (
+  SELECT player_id, season_start_year,
+         SUM(minutes) AS season_minutes,
+         SUM(starts) AS season_starts,
+         SUM(appearances) AS season_appearances,
+         COUNT(DISTINCT club) AS season_clubs
+  FROM history
+  GROUP BY player_id, season_start_year
+),
+season_windows AS (
+  SELECT player_id, season_start_year, season_minutes, season_starts, season_appearances, season_clubs,
+         CASE WHEN LAG(season_start_year) {previous} = season_start_year - 1 THEN 1 ELSE 0 END AS played_prev,
+         CASE WHEN LAG(season_start_year) {previous} = season_start_year - 1
+              THEN LAG(season_minutes) {previous} ELSE 0 END AS prev_season_minutes,
+         COALESCE(SUM(season_minutes) {frame}, 0) AS rolling_minutes,
+         SUM(season_starts) {frame} AS rolling_starts,
+         SUM(season_appearances) {frame} AS rolling_appearances
+  FROM player_seasons
+),
+previous_clubs AS (
+  SELECT DISTINCT player_id, season_start_year + 1 AS season_start_year, club FROM history
+)
+SELECT f.{', f.'.join(FEATURE_SELECT_COLUMNS)},
+  w.prev_season_minutes,
+  w.rolling_minutes,
+  w.season_minutes * {window}.0 / NULLIF(w.rolling_minutes, 0) AS load_spike,
+  w.season_starts * 1.0 / NULLIF(w.season_appearances, 0)
+    - w.rolling_starts * 1.0 / NULLIF(w.rolling_appearances, 0) AS start_ratio_trend,
+  CASE WHEN w.played_prev = 1 AND p.club IS NULL THEN 1 ELSE 0 END AS new_club,
+  CASE WHEN w.season_clubs > 1 THEN 1 ELSE 0 END AS multi_club_season
+FROM history f
+JOIN season_windows w
+  ON f.player_id = w.player_id AND f.season_start_year = w.season_start_year
+LEFT JOIN previous_clubs p
+  ON f.player_id = p.player_id AND f.season_start_year = p.season_start_year AND f.club = p.club
+{where.strip()}"""
+    if order_by:
+        sql = sql.rstrip() + "\nORDER BY f.season_start_year"
+    return sql.strip(), history_params + params
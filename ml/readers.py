@@ -0,0 +1,117 @@
+"""
+Streaming readers for career datasets
+Yield fixed-size typed chunks from CSV, gzip CSV and Excel sources with bounded memory
+"""
+import csv
+import gzip
+import os
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Column order of LITMANEN.RAW.PLAYER_SEASON_DATA
+COLUMNS = ['season', 'competition', 'club', 'appearances', 'starts', 'ppg', 'minutes', 'player_id']
+
+# Columns a source must have; player_id is optional and defaults to the single-player dataset
+REQUIRED_COLUMNS = COLUMNS[:-1]
+DEFAULT_PLAYER_ID = 'litmanen'
+
+SUPPORTED_SUFFIXES = ('.csv', '.csv.gz', '.xlsx')
+
+def parse_row(row):
+    """Convert one CSV row to a typed tuple in table column order"""
+    # Handle empty ppg values
+    ppg = row['ppg'] if row['ppg'] else None
+    return (
+        row['season'],
+        row['competition'],
+        row['club'],
+        int(row['appearances']),
+        int(row['starts']),
+        float(ppg) if ppg else None,
+        int(row['minutes']),
+        row.get('player_id') or DEFAULT_PLAYER_ID
+    )
+
+def iter_source_files(path):
+    """Yield supported data files under path (a file or a directory tree), in sorted order"""
+    if os.path.isfile(path):
+        yield path
+        return
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(SUPPORTED_SUFFIXES):
+                yield os.path.join(root, name)
+
+def _iter_csv_rows(f):
+    for row in csv.DictReader(f):
+        yield {key.strip().lower(): value for key, value in row.items() if key}
+
+def _excel_cell(value):
+    """Render an Excel cell the way it would appear in the CSV export"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def _iter_excel_rows(path):
+    from openpyxl import load_workbook
+    
+    # read_only streams rows instead of building the whole workbook in memory
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            header = [_excel_cell(h).lower() for h in header or ()]
+            if not set(REQUIRED_COLUMNS).issubset(header):
+                print(f"Skipping sheet '{sheet.title}' in {path}: missing columns {REQUIRED_COLUMNS}")
+                continue
+            for values in rows:
+                if all(v is None for v in values):
+                    continue
+                yield {key: _excel_cell(value) for key, value in zip(header, values)}
+    finally:
+        workbook.close()
+
+def iter_rows(path):
+    """Yield raw rows (column -> string) from a single CSV, gzip CSV or Excel file"""
+    lower = path.lower()
+    if lower.endswith('.xlsx'):
+        yield from _iter_excel_rows(path)
+    elif lower.endswith('.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+            yield from _iter_csv_rows(f)
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            yield from _iter_csv_rows(f)
+
+def iter_chunks(path, chunk_size=10000):
+    """Yield typed column chunks of at most chunk_size rows from a file or directory tree"""
+    chunk = {col: [] for col in COLUMNS}
+    size = 0
+    for file_path in iter_source_files(path):
+        for row in iter_rows(file_path):
+            for col, value in zip(COLUMNS, parse_row(row)):
+                chunk[col].append(value)
+            size += 1
+            if size >= chunk_size:
+                yield chunk
+                chunk = {col: [] for col in COLUMNS}
+                size = 0
+    if size:
+        yield chunk
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    if os.uname().sysname == 'Darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
@@ -0,0 +1,82 @@
+"""
+Trigger and verify the materialized feature table
+Step 31: see snowflake/06_create_feature_table.sql
+"""
+import argparse
+import time
+from connections import get_pool
+
+FEATURES_VIEW = 'LITMANEN.FEATURES.LITMANEN_FEATURES'
+FEATURES_TABLE = 'LITMANEN.FEATURES.LITMANEN_FEATURES_TABLE'
+RAW_STREAM = 'LITMANEN.RAW.PLAYER_SEASON_DATA_STREAM'
+
+def _scalar(cursor, sql):
+    cursor.execute(sql)
+    return cursor.fetchone()[0]
+
+def refresh_feature_table(cursor, full=False):
+    """Recompute touched partitions (or rebuild everything with full=True)"""
+    start = time.perf_counter()
+    if full:
+        # Reset the stream first: raw rows committed during the rebuild stay in the stream, and the
+        # next refresh recomputes their partitions instead of missing them
+        cursor.execute(f"CREATE OR REPLACE STREAM {RAW_STREAM} COPY GRANTS ON TABLE LITMANEN.RAW.PLAYER_SEASON_DATA")
+        cursor.execute(f"CREATE OR REPLACE TABLE {FEATURES_TABLE} CLUSTER BY (player_id, season_start_year) "
+                       f"COPY GRANTS AS SELECT * FROM {FEATURES_VIEW}")
+        result = 'full rebuild'
+    else:
+        if not _scalar(cursor, f"SELECT SYSTEM$STREAM_HAS_DATA('{RAW_STREAM}')"):
+            print("No raw changes since the last refresh")
+            return 'up to date'
+        result = _scalar(cursor, "CALL LITMANEN.FEATURES.REFRESH_LITMANEN_FEATURES()")
+    print(f"Feature table refresh: {result} ({time.perf_counter() - start:.2f}s)")
+    return result
+
+def verify_feature_table(cursor):
+    """Check the feature table matches the view; returns True if identical"""
+    start = time.perf_counter()
+    view_rows = _scalar(cursor, f"SELECT COUNT(*) FROM {FEATURES_VIEW}")
+    table_rows = _scalar(cursor, f"SELECT COUNT(*) FROM {FEATURES_TABLE}")
+    missing = _scalar(cursor, f"SELECT COUNT(*) FROM (SELECT * FROM {FEATURES_VIEW} "
+                              f"MINUS SELECT * FROM {FEATURES_TABLE})")
+    extra = _scalar(cursor, f"SELECT COUNT(*) FROM (SELECT * FROM {FEATURES_TABLE} "
+                            f"MINUS SELECT * FROM {FEATURES_VIEW})")
+    ok = view_rows == table_rows and missing == 0 and extra == 0
+    print(f"View rows: {view_rows}, table rows: {table_rows}, "
+          f"missing from table: {missing}, stale in table: {extra}")
+    print(f"Verification {'OK' if ok else 'FAILED'} ({time.perf_counter() - start:.2f}s)")
+    return ok
+
+def compare_read_latency(cursor, repeat=3):
+    """Time a full read of the view vs the table (result cache disabled)"""
+    cursor.execute("ALTER SESSION SET USE_CACHED_RESULT = FALSE")
+    for relation in (FEATURES_VIEW, FEATURES_TABLE):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cursor.execute(f"SELECT * FROM {relation}")
+            cursor.fetchall()
+            timings.append(time.perf_counter() - start)
+        print(f"{relation}: best {min(timings):.3f}s of {repeat}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Refresh and verify LITMANEN_FEATURES_TABLE")
+    parser.add_argument('--full', action='store_true', help="Rebuild the whole table")
+    parser.add_argument('--verify', action='store_true', help="Compare the table against the view")
+    parser.add_argument('--no-refresh', action='store_true', help="Skip the refresh step")
+    parser.add_argument('--latency', action='store_true', help="Compare view vs table read latency")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    with get_pool('FEATURES').connection() as conn:
+        cursor = conn.cursor()
+        try:
+            if not args.no_refresh:
+                refresh_feature_table(cursor, full=args.full)
+            if args.verify:
+                verify_feature_table(cursor)
+            if args.latency:
+                compare_read_latency(cursor)
+        finally:
+            cursor.close()
@@ -0,0 +1,216 @@
+"""
+Synthetic career dataset generator
+Generates raw PLAYER_SEASON_DATA rows for N players that look like the real career CSV:
+the same leagues, cups and European competitions, with appearances, starts, minutes and
+ppg drawn from distributions fitted to the real rows per competition kind.
+
+Usage: python ml/synthetic.py --players 10000 --output data/synthetic_10000.csv.gz
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from features import DEFAULT_CSV_PATH, RAW_COLUMNS, load_raw_csv, parse_season_start_year
+
+# Leagues of the career dataset: domestic cups, clubs, and whether seasons are calendar years
+LEAGUES = {
+    'Veikkausliiga': {'cups': ['Suomen Cup', 'Liigacup'], 'calendar': True,
+                      'clubs': ['HJK Helsinki', 'FC Lahti', 'MYPA', 'Lahden Reipas']},
+    'Eredivisie': {'cups': ['KNVB Beker', 'Johan Cruijff Schaal'], 'calendar': False, 'clubs': ['Ajax']},
+    'Premier League': {'cups': ['FA Cup', 'League Cup'], 'calendar': False, 'clubs': ['Liverpool']},
+    'LaLiga': {'cups': ['Copa del Rey', 'Supercopa'], 'calendar': False, 'clubs': ['Barcelona']},
+    'Bundesliga': {'cups': ['DFB-Pokal'], 'calendar': False, 'clubs': ['Hansa Rostock']},
+}
+
+# Competitions outside the domestic calendar
+CALENDAR_COMPETITIONS = {'Intercontinental Cup'}
+
+# Each league is topped up with numbered clubs so players can move within a league
+DEFAULT_CLUBS_PER_LEAGUE = 18
+
+def competition_kind(competition):
+    """'league', 'cup' or 'european'"""
+    if competition in LEAGUES:
+        return 'league'
+    if any(competition in league['cups'] for league in LEAGUES.values()):
+        return 'cup'
+    return 'european'
+
+def fit_profile(raw_df):
+    """Per-kind distributions, competition rates and club movement fitted to real raw rows"""
+    df = raw_df[raw_df['minutes'].notna()].copy()
+    df['kind'] = df['competition'].map(competition_kind)
+    df['minutes_per_appearance'] = df['minutes'] / df['appearances'].where(df['appearances'] > 0)
+
+    kinds = {}
+    for kind, rows in df.groupby('kind'):
+        kinds[kind] = {
+            'appearances_mean': float(rows['appearances'].mean()),
+            'appearances_std': float(rows['appearances'].std(ddof=0)),
+            'appearances_max': int(rows['appearances'].max()),
+            'start_rate': float(rows['starts'].sum() / max(rows['appearances'].sum(), 1)),
+            'minutes_per_appearance_mean': float(rows['minutes_per_appearance'].mean()),
+            'minutes_per_appearance_std': float(rows['minutes_per_appearance'].std(ddof=0)),
+            'ppg_mean': float(rows['ppg'].mean()),
+            'ppg_std': float(rows['ppg'].std(ddof=0)),
+        }
+
+    # Competition rates per season of the league (cups) or of the whole career (European)
+    n_seasons = df['season'].nunique()
+    league_seasons = df[df['kind'] == 'league'].groupby('competition')['season'].nunique()
+    cup_rates = {}
+    for league_name, league in LEAGUES.items():
+        for cup in league['cups']:
+            played = df.loc[df['competition'] == cup, 'season'].nunique()
+            cup_rates[cup] = min(played / max(league_seasons.get(league_name, 0), 1), 1.0)
+    european = df[df['kind'] == 'european']
+    european_rates = (european.groupby('competition')['season'].nunique() / n_seasons).to_dict()
+
+    # A club change starts a new stint; the real career has one every couple of seasons
+    league = df[df['kind'] == 'league'].assign(year=parse_season_start_year(df['season']))
+    clubs_by_year = league.sort_values('year').drop_duplicates('year')['club']
+    moves = int((clubs_by_year != clubs_by_year.shift()).sum()) - 1
+    league_weights = (league_seasons / league_seasons.sum()).to_dict()
+    return {
+        'kinds': kinds,
+        'cup_rates': cup_rates,
+        'european_rates': european_rates,
+        'move_rate': moves / max(len(clubs_by_year) - 1, 1),
+        'league_weights': {name: league_weights.get(name, 0.0) for name in LEAGUES},
+        'career_seasons': int(n_seasons),
+    }
+
+def _club_table(clubs_per_league):
+    """(league, club slot) -> club name: the real clubs first, then numbered ones"""
+    table = []
+    for league_name, league in LEAGUES.items():
+        clubs = list(league['clubs'])[:clubs_per_league]
+        clubs += [f"{league_name} Club {i:02d}" for i in range(len(clubs) + 1, clubs_per_league + 1)]
+        table.append(clubs)
+    return np.array(table, dtype=object)
+
+def _season_labels(years, calendar):
+    """'2011' for calendar-year competitions, '11/12' otherwise"""
+    split = (pd.Series(years % 100).map('{:02d}'.format) + '/'
+             + pd.Series((years + 1) % 100).map('{:02d}'.format)).to_numpy()
+    return np.where(calendar, years.astype(str), split)
+
+def generate_career_dataset(n_players, seed=42, profile=None, transfer_rate=0.1,
+                            clubs_per_league=DEFAULT_CLUBS_PER_LEAGUE):
+    """Raw season rows for n_players synthetic careers, in PLAYER_SEASON_DATA column order
+
+    profile defaults to fit_profile() on the real career CSV. transfer_rate is the share of
+    seasons with a mid-season move inside the league, which splits that league's season
+    over two clubs (the only way a player gets two rows in one competition and season).
+    """
+    rng = np.random.default_rng(seed)
+    profile = profile or fit_profile(load_raw_csv(DEFAULT_CSV_PATH))
+    league_names = list(LEAGUES)
+    clubs = _club_table(clubs_per_league)
+
+    # Player-seasons: careers of 8 to ~the real length, starting between 1960 and 2010
+    max_len = max(profile['career_seasons'], 9)
+    lengths = rng.integers(8, max_len + 1, n_players)
+    player = np.repeat(np.arange(n_players), lengths)
+    offset = np.arange(len(player)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    year = np.repeat(rng.integers(1960, 2011, n_players), lengths) + offset
+
+    # Stints: a new club (and possibly league) at the start of a career or on a move
+    new_stint = (offset == 0) | (rng.random(len(player)) < profile['move_rate'])
+    stint = np.cumsum(new_stint) - 1
+    weights = np.array([profile['league_weights'][name] for name in league_names])
+    stint_league = rng.choice(len(league_names), stint[-1] + 1, p=weights / weights.sum())
+    stint_club = rng.integers(0, clubs_per_league, stint[-1] + 1)
+    seasons = pd.DataFrame({
+        'player': player,
+        'year': year,
+        'league': stint_league[stint],
+        'club': stint_club[stint],
+        'share': 1.0,
+    })
+
+    # Mid-season transfers: the league season is split with another club of the same league
+    moved = seasons[rng.random(len(seasons)) < transfer_rate].copy()
+    share = rng.uniform(0.2, 0.8, len(moved))
+    seasons.loc[moved.index, 'share'] = share
+    moved['club'] = (moved['club'] + rng.integers(1, clubs_per_league, len(moved))) % clubs_per_league
+    moved['share'] = 1.0 - share
+    league_rows = pd.concat([seasons, moved], ignore_index=True)
+    league_rows['competition'] = np.array(league_names, dtype=object)[league_rows['league']]
+
+    # Cups and European competitions go with the season's first club
+    parts = [league_rows]
+    for league_idx, league_name in enumerate(league_names):
+        in_league = seasons[seasons['league'] == league_idx]
+        for cup in LEAGUES[league_name]['cups']:
+            played = in_league[rng.random(len(in_league)) < profile['cup_rates'][cup]]
+            parts.append(played.assign(competition=cup, share=1.0))
+    for competition, rate in profile['european_rates'].items():
+        played = seasons[rng.random(len(seasons)) < rate]
+        parts.append(played.assign(competition=competition, share=1.0))
+    rows = pd.concat(parts, ignore_index=True)
+
+    # Per-row statistics from the fitted per-kind distributions
+    n = len(rows)
+    kind = rows['competition'].map(competition_kind).to_numpy()
+    stats = {key: np.empty(n) for key in profile['kinds']['league']}
+    for kind_name, params in profile['kinds'].items():
+        mask = kind == kind_name
+        for key, value in params.items():
+            stats[key][mask] = value
+    appearances = np.clip(
+        np.rint(rng.normal(stats['appearances_mean'], stats['appearances_std']) * rows['share'].to_numpy()),
+        1, stats['appearances_max']
+    ).astype(int)
+    per_appearance = np.clip(
+        rng.normal(stats['minutes_per_appearance_mean'], stats['minutes_per_appearance_std']), 5, 90
+    )
+    league_calendar = np.array([LEAGUES[name]['calendar'] for name in league_names])
+    calendar = ((league_calendar[rows['league'].to_numpy()] & (kind != 'european'))
+                | rows['competition'].isin(CALENDAR_COMPETITIONS).to_numpy())
+
+    result = pd.DataFrame({
+        'season': _season_labels(rows['year'].to_numpy(), calendar),
+        'competition': rows['competition'].to_numpy(),
+        'club': clubs[rows['league'].to_numpy(), rows['club'].to_numpy()],
+        'appearances': appearances,
+        'starts': rng.binomial(appearances, stats['start_rate']),
+        'ppg': np.round(np.clip(rng.normal(stats['ppg_mean'], stats['ppg_std']), 0, 3), 2),
+        'minutes': np.rint(appearances * per_appearance).astype(int),
+        'player_id': pd.Series(rows['player'].to_numpy()).map('player_{:05d}'.format).to_numpy(),
+    })
+    return result.sort_values(['player_id', 'season'], kind='stable')[RAW_COLUMNS].reset_index(drop=True)
+
+def compare_to_real(synthetic_df, raw_df):
+    """Print per-kind means of the real and synthetic rows side by side"""
+    columns = ['appearances', 'starts', 'minutes', 'ppg']
+    frames = {'real': raw_df[raw_df['minutes'].notna()], 'synthetic': synthetic_df}
+    summary = pd.concat({
+        name: df.assign(kind=df['competition'].map(competition_kind)).groupby('kind')[columns].mean()
+        for name, df in frames.items()
+    }, axis=1).swaplevel(axis=1).sort_index(axis=1)
+    print(summary.round(2).to_string())
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a synthetic multi-player career dataset")
+    parser.add_argument('--players', type=int, default=1000, help="Number of synthetic players")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--transfer-rate', type=float, default=0.1,
+                        help="Share of seasons split between two clubs of one league")
+    parser.add_argument('--output', help="Write rows to this CSV, .csv.gz or .parquet file")
+    parser.add_argument('--compare', action='store_true', help="Print per-kind means next to the real data")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    raw = load_raw_csv(DEFAULT_CSV_PATH)
+    df = generate_career_dataset(args.players, seed=args.seed, profile=fit_profile(raw),
+                                 transfer_rate=args.transfer_rate)
+    print(f"Generated {len(df):,} rows for {args.players:,} players")
+    if args.compare:
+        compare_to_real(df, raw)
+    if args.output and args.output.endswith('.parquet'):
+        df.to_parquet(args.output, index=False)
+        print(f"Wrote {args.output}")
+    elif args.output:
+        df.to_csv(args.output, index=False)
+        print(f"Wrote {args.output}")
@@ -2,68 +2,167 @@
 ML Model Training - Step 40-43
 Pull features with Snowpark, define target, train baseline model, persist model
 """
+import argparse
 import os
-import pickle
-from dotenv import load_dotenv
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-import snowflake.connector
-
-# Load environment variables
-load_dotenv()
-
-def get_snowflake_connection():
-    """Create Snowflake connection"""
-    conn = snowflake.connector.connect(
-        account=os.getenv('SNOWFLAKE_ACCOUNT'),
-        user=os.getenv('SNOWFLAKE_USER'),
-        password=os.getenv('SNOWFLAKE_PASSWORD'),
-        warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-        database='LITMANEN',
-        schema='FEATURES',
-        role=os.getenv('SNOWFLAKE_ROLE', 'ACCOUNTADMIN')
-    )
-    return conn
-
-def pull_features():
-    """Step 40: Pull features with Snowpark -> pandas"""
-    print("Step 40: Pulling features from Snowflake...")
-    
-    conn = get_snowflake_connection()
-    cursor = conn.cursor()
+from connections import BACKEND, get_pool
+from features import load_local_features
+import feature_cache
+from model_selection import select_model_cv
+from queries import WORKLOAD_COLUMNS, build_features_query, build_workload_query
+from workload import DEFAULT_WINDOW, compute_workload_features
+from instrumentation import RunProfiler, instrument_cursor
+from readers import peak_rss_mb
+from artifacts import load_artifact, save_artifact, training_data_hash
+import incremental
+
+# Pipeline stages timed by RunProfiler
+STAGES = ['pull', 'define_target', 'prepare_features', 'split', 'train', 'persist']
+
+# View or materialized table (snowflake/06_create_feature_table.sql) to read features from
+FEATURES_RELATION = os.getenv('LITMANEN_FEATURES_RELATION', 'LITMANEN.FEATURES.LITMANEN_FEATURES')
+
+def _fetch_tuples(cursor):
+    """Row path: fetchall() -> Python tuples -> DataFrame"""
+    columns = [desc[0].lower() for desc in cursor.description]
+    return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+def _normalize_arrow_batch(table):
+    """Give every batch the same schema: Snowflake picks the narrowest int/decimal type per batch"""
+    import pyarrow as pa
+    
+    fields = []
+    for field in table.schema:
+        if pa.types.is_integer(field.type):
+            field = field.with_type(pa.int64())
+        elif pa.types.is_decimal(field.type):
+            field = field.with_type(pa.float64())
+        fields.append(field.with_name(field.name.lower()))
+    return table.rename_columns([f.name for f in fields]).cast(pa.schema(fields))
+
+def _fetch_arrow(cursor, parquet_path=None):
+    """Columnar path: Arrow record batches -> DataFrame, optionally spilled to Parquet"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    tables = []
+    writer = None
+    try:
+        for table in cursor.fetch_arrow_batches():
+            table = _normalize_arrow_batch(table)
+            if parquet_path:
+                if writer is None:
+                    writer = pq.ParquetWriter(parquet_path, table.schema)
+                writer.write_table(table)
+            tables.append(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    if not tables:
+        return pd.DataFrame(columns=[desc[0].lower() for desc in cursor.description])
+    # self_destruct frees each Arrow column as soon as it has been converted
+    return pa.concat_tables(tables).to_pandas(split_blocks=True, self_destruct=True)
+
+def pull_features(local_csv=None, fetch='tuples', parquet_path=None, use_cache=False,
+                  cache_max_bytes=feature_cache.DEFAULT_MAX_BYTES, player_id=None, profiler=None,
+                  year_min=None, workload_window=None):
+    """Step 40: Pull features with Snowpark -> pandas
+
+    With local_csv, features are computed offline from the raw CSV instead.
+    player_id limits the pull to one player's rows (pruned by the player_id clustering key).
+    year_min limits it to seasons starting in or after that year (incremental training).
+    workload_window adds the rolling workload columns over that many seasons (workload.py);
+    with year_min only that many earlier seasons are read as history.
+    fetch='arrow' streams Arrow record batches instead of Python tuples and,
+    with parquet_path, also writes them to a local Parquet file.
+    use_cache reuses a local snapshot while the source's freshness token is unchanged.
+    profiler (a RunProfiler) records the ID, execute and fetch time of every query.
+    """
+    if local_csv:
+        print(f"Step 40: Computing features locally from {local_csv}...")
+        df = load_local_features(local_csv)
+        if player_id is not None:
+            df = df[df['player_id'] == player_id].reset_index(drop=True)
+        if workload_window is not None:
+            df = compute_workload_features(df, workload_window, year_min=year_min)
+        elif year_min is not None:
+            df = df[df['season_start_year'] >= year_min].reset_index(drop=True)
+        print(f"Computed {len(df)} records locally")
+        return df
+    
+    print(f"Step 40: Pulling features from Snowflake ({fetch} fetch)...")
+    
+    conn = get_pool('FEATURES').acquire()
+    cursor = instrument_cursor(conn.cursor(), profiler)
     
     try:
         # Query the features view
-        query = """
-        SELECT 
-            season,
-            club,
-            competition,
-            appearances,
-            starts,
-            ppg,
-            minutes,
-            appearance_ratio,
-            minutes_ratio,
-            season_start_year
-        FROM LITMANEN.FEATURES.LITMANEN_FEATURES
-        ORDER BY season_start_year
-        """
+        if workload_window is not None:
+            query, params = build_workload_query(FEATURES_RELATION, workload_window, year_min=year_min,
+                                                 player_id=player_id)
+        else:
+            query, params = build_features_query(FEATURES_RELATION, year_min=year_min, player_id=player_id)
+        
+        if use_cache:
+            start = time.perf_counter()
+            freshness = feature_cache.probe_freshness(cursor, FEATURES_RELATION, player_id)
+            key = feature_cache.cache_key(f"{query} {params}", freshness)
+            df = feature_cache.load_snapshot(key)
+            if df is not None:
+                print(f"Loaded {len(df)} records from feature snapshot cache "
+                      f"({time.perf_counter() - start:.3f}s including freshness probe)")
+                return df
         
-        cursor.execute(query)
-        columns = [desc[0] for desc in cursor.description]
-        data = cursor.fetchall()
+        cursor.execute(query, params)
+        if fetch == 'arrow':
+            df = _fetch_arrow(cursor, parquet_path)
+        else:
+            df = _fetch_tuples(cursor)
         
-        df = pd.DataFrame(data, columns=columns)
         print(f"Pulled {len(df)} records from Snowflake")
+        if parquet_path and fetch == 'arrow':
+            print(f"Features written to: {parquet_path}")
+        if use_cache:
+            feature_cache.store_snapshot(key, df, max_bytes=cache_max_bytes)
         return df
         
     finally:
         cursor.close()
-        conn.close()
+        get_pool('FEATURES').release(conn)
+
+def _timed_pull(fetch):
+    """Run one pull in a fresh process and report time and peak memory"""
+    start = time.perf_counter()
+    df = pull_features(fetch=fetch)
+    return {
+        'fetch': fetch,
+        'rows': len(df),
+        'seconds': time.perf_counter() - start,
+        'peak_rss_mb': peak_rss_mb(),
+        'frame_mb': df.memory_usage(deep=True).sum() / (1024 * 1024)
+    }
+
+def compare_fetch_paths():
+    """Compare the tuple and Arrow fetch paths, each in its own process so peak RSS is not shared"""
+    results = []
+    for fetch in ('tuples', 'arrow'):
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results.append(executor.submit(_timed_pull, fetch).result())
+    
+    print(f"\n{'fetch':<8} {'rows':>9} {'seconds':>8} {'peak RSS MB':>12} {'frame MB':>9}")
+    for r in results:
+        peak = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else 'n/a'
+        print(f"{r['fetch']:<8} {r['rows']:>9} {r['seconds']:>8.2f} {peak:>12} {r['frame_mb']:>9.1f}")
+    return results
 
 def define_target(df):
     """Step 41: Define simple target - label_low_availability = minutes_ratio < 0.4"""
@@ -80,7 +179,7 @@ def define_target(df):
     return df
 
 def prepare_features(df):
-    """Prepare features for modeling"""
+    """Prepare features for modeling; rolling workload columns are used whenever df has them"""
     # Select numeric features
     feature_cols = [
         'appearances',
@@ -90,7 +189,7 @@ def prepare_features(df):
         'appearance_ratio',
         'minutes_ratio',
         'season_start_year'
-    ]
+    ] + [c for c in WORKLOAD_COLUMNS if c in df.columns]
     
     # Create feature matrix
     X = df[feature_cols].fillna(0)
@@ -135,18 +234,13 @@ def train_baseline_model(X_train, y_train, X_test, y_test):
     
     return results[best_model_name]['model'], best_model_name, results
 
-def persist_model(model, model_name, feature_cols):
-    """Step 43: Persist model artifact"""
+def persist_model(model, model_name, feature_cols, data_hash=None, metrics=None, model_path=None):
+    """Step 43: Persist model artifact (manifest.json + memory-mappable model.joblib)"""
     print(f"\nStep 43: Persisting model '{model_name}'...")
     
     # Save model locally
-    model_path = f'ml/model_{model_name.lower()}.pkl'
-    with open(model_path, 'wb') as f:
-        pickle.dump({
-            'model': model,
-            'feature_columns': feature_cols,
-            'model_name': model_name
-        }, f)
+    model_path = model_path or f'ml/model_{model_name.lower()}'
+    save_artifact(model_path, model, model_name, feature_cols, data_hash=data_hash, metrics=metrics)
     
     print(f"Model saved to: {model_path}")
     
@@ -165,34 +259,165 @@ def persist_model(model, model_name, feature_cols):
     
     return model_path
 
-def main():
-    """Main training pipeline"""
+def train_incremental(artifact_dir, local_csv=None, fetch='tuples', parquet_path=None, use_cache=False,
+                      cache_max_bytes=feature_cache.DEFAULT_MAX_BYTES, profiler=None,
+                      trees_per_update=incremental.DEFAULT_TREES_PER_UPDATE,
+                      max_estimators=incremental.DEFAULT_MAX_ESTIMATORS,
+                      drift_threshold=incremental.DEFAULT_DRIFT_THRESHOLD):
+    """Update the artifact with the seasons after its last trained one
+
+    Returns (model, model_name, state), or None when a full refit is needed instead.
+    """
+    profiler = profiler or RunProfiler()
+    state = incremental.load_state(artifact_dir)
+    if state is None:
+        print(f"\nNo training state in {artifact_dir}: running a full fit")
+        return None
+    artifact = load_artifact(artifact_dir, mmap=False, expected_features=state['feature_columns'])
+    model, model_name = artifact['model'], artifact['model_name']
+    print(f"\nIncremental update of {model_name} ({artifact_dir}), "
+          f"trained through season {state['last_season_start_year']}")
+    
+    with profiler.stage('pull') as stage:
+        df = pull_features(local_csv, fetch=fetch, parquet_path=parquet_path, use_cache=use_cache,
+                           cache_max_bytes=cache_max_bytes, player_id=state['player_id'], profiler=profiler,
+                           year_min=state['last_season_start_year'] + 1, workload_window=state.get('workload_window'))
+        stage['rows'] = len(df)
+    if df.empty:
+        print("No new seasons since the last training run: model is up to date")
+        return model, model_name, state
+    
+    with profiler.stage('define_target') as stage:
+        df = define_target(df)
+        stage['rows'] = len(df)
+    
+    with profiler.stage('prepare_features') as stage:
+        X_new, y_new, feature_cols = prepare_features(df)
+        stage['rows'] = len(X_new)
+    
+    reasons, accuracy = incremental.check_drift(state, model, X_new, y_new, threshold=drift_threshold)
+    reasons += incremental.update_blockers(model, y_new, max_estimators, trees_per_update)
+    print(f"Current model accuracy on {len(X_new)} new rows: {accuracy:.3f}")
+    if reasons:
+        print("Falling back to a full refit: " + "; ".join(reasons))
+        return None
+    
+    with profiler.stage('train') as stage:
+        stage['rows'] = len(X_new)
+        action = incremental.update_model(model, X_new, y_new, trees_per_update)
+        print(f"Step 42: Updated {model_name}: {action}")
+    
+    with profiler.stage('persist'):
+        state = incremental.record_update(state, X_new, y_new, action, accuracy,
+                                          data_hash=training_data_hash(X_new, y_new))
+        metrics = dict(artifact['manifest']['metrics'], incremental_updates=len(state['updates']),
+                       last_update_accuracy=accuracy)
+        persist_model(model, model_name, feature_cols, data_hash=artifact['manifest']['training_data_hash'],
+                      metrics=metrics, model_path=artifact_dir)
+        incremental.save_state(artifact_dir, state)
+    print(f"Trained through season {state['last_season_start_year']} ({state['rows_trained']} rows in total)")
+    return model, model_name, state
+
+def main(local_csv=None, fetch='tuples', parquet_path=None, use_cache=False,
+         cache_max_bytes=feature_cache.DEFAULT_MAX_BYTES, cv=None, cv_folds=5, n_jobs=-1,
+         measure_speedup=False, player_id=None, profiler=None, incremental_update=False,
+         artifact_dir=None, trees_per_update=incremental.DEFAULT_TREES_PER_UPDATE,
+         max_estimators=incremental.DEFAULT_MAX_ESTIMATORS, drift_threshold=incremental.DEFAULT_DRIFT_THRESHOLD,
+         workload_window=None):
+    """Main training pipeline; each step is a stage of profiler (a RunProfiler) when given
+
+    incremental_update first tries train_incremental() on artifact_dir (default: the most
+    recently trained artifact) and only runs the full pipeline when that asks for a refit.
+    workload_window adds rolling workload features over that many seasons; a refit after an
+    incremental attempt keeps the artifact's window and player unless others are given, and
+    replaces the artifact in place.
+    """
+    profiler = profiler or RunProfiler()
     print("=" * 60)
     print("Jari Litmanen ML Model Training")
     print("=" * 60)
     
+    if incremental_update:
+        artifact_dir = artifact_dir or incremental.latest_artifact()
+        if artifact_dir is None:
+            print("\nNo trained artifact with a training state yet: running a full fit")
+        else:
+            state = incremental.load_state(artifact_dir) or {}
+            if workload_window is None:
+                workload_window = state.get('workload_window')
+            if player_id is None:
+                player_id = state.get('player_id')
+            updated = train_incremental(artifact_dir, local_csv, fetch=fetch, parquet_path=parquet_path,
+                                        use_cache=use_cache, cache_max_bytes=cache_max_bytes, profiler=profiler,
+                                        trees_per_update=trees_per_update, max_estimators=max_estimators,
+                                        drift_threshold=drift_threshold)
+            if updated is not None:
+                model, model_name, state = updated
+                return model, model_name, {'state': state}
+            # The refit's stages are recorded under their own names
+            profiler.stages = [dict(s, stage=f"inc:{s['stage']}") for s in profiler.stages]
+            profiler.queries = [dict(q, stage=f"inc:{q['stage']}") for q in profiler.queries]
+    
     # Step 40: Pull features
-    df = pull_features()
+    with profiler.stage('pull') as stage:
+        df = pull_features(local_csv, fetch=fetch, parquet_path=parquet_path, use_cache=use_cache,
+                           cache_max_bytes=cache_max_bytes, player_id=player_id, profiler=profiler,
+                           workload_window=workload_window)
+        stage['rows'] = len(df)
     
     # Step 41: Define target
-    df = define_target(df)
+    with profiler.stage('define_target') as stage:
+        df = define_target(df)
+        stage['rows'] = len(df)
     
     # Prepare features
-    X, y, feature_cols = prepare_features(df)
+    with profiler.stage('prepare_features') as stage:
+        X, y, feature_cols = prepare_features(df)
+        stage['rows'] = len(X)
     
     # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.3, random_state=42, stratify=y
-    )
+    with profiler.stage('split') as stage:
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.3, random_state=42, stratify=y
+        )
+        stage['rows'] = len(X_train)
     
     print(f"\nTrain set: {len(X_train)} samples")
     print(f"Test set: {len(X_test)} samples")
     
-    # Step 42: Train baseline model
-    best_model, model_name, all_results = train_baseline_model(X_train, y_train, X_test, y_test)
+    # Step 42: Train baseline model (or select one by cross-validation)
+    with profiler.stage('train') as stage:
+        stage['rows'] = len(X_train)
+        if cv:
+            # Time-series CV needs the training rows in season order
+            order = X_train['season_start_year'].to_numpy().argsort(kind='stable')
+            best_model, model_name, all_results = select_model_cv(
+                X_train, y_train, cv=cv, n_splits=cv_folds, n_jobs=n_jobs, order=order,
+                measure_speedup=measure_speedup
+            )
+            y_pred = best_model.predict(X_test.to_numpy())
+            holdout_accuracy = accuracy_score(y_test, y_pred)
+            print(f"{model_name} holdout accuracy: {holdout_accuracy:.3f}")
+            print(f"\n{classification_report(y_test, y_pred)}")
+        else:
+            best_model, model_name, all_results = train_baseline_model(X_train, y_train, X_test, y_test)
+    
+    if cv:
+        metrics = {'holdout_accuracy': holdout_accuracy, 'cv_mean_accuracy': all_results[0]['mean_score'],
+                   'cv': cv, 'params': all_results[0]['params']}
+    else:
+        metrics = {'holdout_accuracy': all_results[model_name]['accuracy']}
     
     # Step 43: Persist model
-    model_path = persist_model(best_model, model_name, feature_cols)
+    with profiler.stage('persist'):
+        model_path = persist_model(best_model, model_name, feature_cols,
+                                   data_hash=training_data_hash(X_train, y_train), metrics=metrics,
+                                   model_path=artifact_dir if incremental_update else None)
+        # Training state for later incremental updates: every pulled season counts as consumed
+        incremental.save_state(model_path, incremental.new_state(
+            model_name, feature_cols, X_train, y_train, X['season_start_year'].max(), metrics, player_id,
+            workload_window
+        ))
     
     print("\n" + "=" * 60)
     print("Training completed successfully!")
@@ -202,15 +427,92 @@ def main():
     
     return best_model, model_name, all_results
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the availability model")
+    parser.add_argument('--local-csv', nargs='?', const=os.path.join('data', 'litmanen_career_dataset_full.csv'),
+                        help="Compute features locally from a raw CSV instead of querying Snowflake")
+    parser.add_argument('--fetch', choices=['tuples', 'arrow'], default='tuples',
+                        help="How to fetch features from Snowflake")
+    parser.add_argument('--parquet', metavar='PATH',
+                        help="With --fetch arrow, also write the features to this Parquet file")
+    parser.add_argument('--compare-fetch', action='store_true',
+                        help="Only compare time and peak memory of the tuple and Arrow fetch paths")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always query Snowflake instead of reusing an unchanged feature snapshot")
+    parser.add_argument('--cache-max-mb', type=int, default=feature_cache.DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Size limit of the feature snapshot cache")
+    parser.add_argument('--clear-cache', action='store_true', help="Delete cached feature snapshots first")
+    parser.add_argument('--cv', choices=['kfold', 'timeseries'],
+                        help="Select the model by cross-validating all candidates and grids")
+    parser.add_argument('--cv-folds', type=int, default=5, help="Number of CV folds")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Parallel CV workers (-1: all cores)")
+    parser.add_argument('--measure-speedup', action='store_true',
+                        help="Also run CV serially and report the parallel speedup")
+    parser.add_argument('--player', metavar='PLAYER_ID',
+                        help="Train on one player's rows only (default: all players)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Update the last trained model with new seasons only; full refit on drift")
+    parser.add_argument('--artifact', metavar='DIR',
+                        help="Artifact to update with --incremental (default: the most recently trained)")
+    parser.add_argument('--trees-per-update', type=int, default=incremental.DEFAULT_TREES_PER_UPDATE,
+                        help="Trees a forest grows per incremental update")
+    parser.add_argument('--max-estimators', type=int, default=incremental.DEFAULT_MAX_ESTIMATORS,
+                        help="Refit a forest from scratch instead of growing it past this many trees")
+    parser.add_argument('--drift-threshold', type=float, default=incremental.DEFAULT_DRIFT_THRESHOLD,
+                        help="Largest feature mean shift (in reference std) an update accepts")
+    parser.add_argument('--workload', nargs='?', type=int, const=DEFAULT_WINDOW, metavar='SEASONS',
+                        help=f"Add rolling workload features over SEASONS seasons (default {DEFAULT_WINDOW})")
+    parser.add_argument('--report', metavar='PATH',
+                        help="Write the stage and query timings of the run to PATH (.json or .csv)")
+    parser.add_argument('--profile-stage', choices=STAGES,
+                        help="Profile one stage; the profile is written next to --report (default: ml/)")
+    parser.add_argument('--profile-mode', choices=['cprofile', 'sample'], default='cprofile',
+                        help="cprofile: deterministic; sample: 5 ms stack samples (collapsed stacks)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    # Check if .env file exists
-    if not os.path.exists('.env'):
+    args = parse_args()
+    
+    # Check if .env file exists (not needed with LITMANEN_BACKEND=duckdb)
+    if not args.local_csv and BACKEND != 'duckdb' and not os.path.exists('.env'):
         print("Warning: .env file not found. Using Snowflake MCP server connection.")
         print("If using direct connection, create .env file with Snowflake credentials.")
     
+    if args.clear_cache:
+        print(f"Removed {feature_cache.clear()} cached feature snapshots")
+    
+    profile_dir = os.path.dirname(args.report) if args.report and os.path.dirname(args.report) else 'ml'
+    profiler = RunProfiler(args.profile_stage, args.profile_mode, profile_dir)
     try:
-        model, name, results = main()
+        if args.compare_fetch:
+            compare_fetch_paths()
+        else:
+            model, name, results = main(
+                args.local_csv,
+                fetch=args.fetch,
+                parquet_path=args.parquet,
+                use_cache=not args.no_cache,
+                cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+                cv=args.cv,
+                cv_folds=args.cv_folds,
+                n_jobs=args.n_jobs,
+                measure_speedup=args.measure_speedup,
+                player_id=args.player,
+                profiler=profiler,
+                incremental_update=args.incremental,
+                artifact_dir=args.artifact,
+                trees_per_update=args.trees_per_update,
+                max_estimators=args.max_estimators,
+                drift_threshold=args.drift_threshold,
+                workload_window=args.workload
+            )
     except Exception as e:
         print(f"\nError during training: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        # Also on failure: the stages that ran show where the time went
+        if profiler.stages:
+            profiler.print_summary()
+            if args.report:
+                print(f"Run report written to: {', '.join(profiler.write(args.report))}")
@@ -0,0 +1,251 @@
+"""
+In-warehouse training and scoring - Snowpark path for Step 40-43
+A stored procedure trains the train_baseline_model candidates on a feature table inside
+Snowflake and writes the artifact (manifest.json + model.joblib) to a stage; a vectorized
+UDF loads that artifact and scores the feature rows where they live, and the scores are
+saved to AVAILABILITY_PREDICTIONS for app_snowflake.py to join. Only the procedure's JSON
+summary leaves the warehouse. --local runs all of it on Snowpark's local testing session.
+"""
+import argparse
+import json
+import os
+import sys
+import pandas as pd
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FEATURES_TABLE = 'LITMANEN.FEATURES.LITMANEN_FEATURES'
+PREDICTIONS_TABLE = 'LITMANEN.FEATURES.AVAILABILITY_PREDICTIONS'
+MODEL_STAGE = '@LITMANEN.FEATURES.MODEL_STAGE/availability'
+PROCEDURE_NAME = 'LITMANEN.FEATURES.TRAIN_AVAILABILITY_MODEL'
+UDF_NAME = 'LITMANEN.FEATURES.PREDICT_AVAILABILITY'
+
+# Sibling modules the procedure and the UDF import (uploaded with them)
+PROCEDURE_MODULES = ['warehouse_ml', 'train_model', 'connections', 'features', 'feature_cache',
+                     'model_selection', 'queries', 'workload', 'instrumentation', 'readers',
+                     'artifacts', 'incremental']
+UDF_MODULES = ['warehouse_ml', 'predict', 'artifacts']
+PACKAGES = ['snowflake-snowpark-python', 'pandas', 'scikit-learn', 'joblib', 'python-dotenv',
+            'snowflake-connector-python']
+
+KEY_COLUMNS = ['player_id', 'season', 'competition', 'club']
+
+def _module_files(modules):
+    return [os.path.join(ML_DIR, f'{m}.py') for m in modules]
+
+def _lower_numeric(df):
+    """Lower-case Snowpark column names; NUMBER(p, s) columns arrive as Decimal objects"""
+    df.columns = [c.lower() for c in df.columns]
+    for c in df.columns:
+        if df[c].dtype == object and c not in KEY_COLUMNS:
+            df[c] = df[c].astype(float)
+    return df
+
+def train_in_warehouse(session, relation, model_stage):
+    """Stored procedure handler: train on relation, put the artifact on model_stage, return a JSON summary"""
+    import tempfile
+    from sklearn.model_selection import train_test_split
+    from artifacts import save_artifact, training_data_hash
+    from train_model import define_target, prepare_features, train_baseline_model
+
+    df = _lower_numeric(session.table(relation).to_pandas())
+    df = define_target(df)
+    X, y, feature_cols = prepare_features(df)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.3, random_state=42, stratify=y
+    )
+    model, model_name, results = train_baseline_model(X_train, y_train, X_test, y_test)
+    metrics = {'holdout_accuracy': results[model_name]['accuracy'], 'relation': relation}
+
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        save_artifact(artifact_dir, model, model_name, feature_cols,
+                      data_hash=training_data_hash(X_train, y_train), metrics=metrics)
+        # Weights first: a stage with a manifest always has complete weights
+        for name in ('model.joblib', 'manifest.json'):
+            with open(os.path.join(artifact_dir, name), 'rb') as f:
+                session.file.put_stream(f, f'{model_stage}/{name}', auto_compress=False, overwrite=True)
+
+    return json.dumps({
+        'model_name': model_name,
+        'rows': int(len(df)),
+        'train_rows': int(len(X_train)),
+        'feature_columns': feature_cols,
+        'accuracy': {name: float(r['accuracy']) for name, r in results.items()},
+        'model_stage': model_stage,
+    })
+
+_loaded = {}
+
+def _import_model():
+    """The artifact imported with the UDF, loaded once per Python process"""
+    from artifacts import load_artifact
+
+    import_dir = sys._xoptions['snowflake_import_directory']
+    if import_dir not in _loaded:
+        _loaded[import_dir] = load_artifact(import_dir)
+    return _loaded[import_dir]
+
+def predict_availability(*columns):
+    """Vectorized UDF handler: one Series per feature column in, low-availability probability out
+
+    Snowflake passes pandas batches; the local testing emulator calls the handler once per
+    row with scalars, which get a one-row frame and a scalar back.
+    """
+    from predict import score_frame
+
+    model_data = _import_model()
+    batch = isinstance(columns[0], pd.Series)
+    if batch:
+        df = pd.concat([c.reset_index(drop=True) for c in columns], axis=1)
+        df.columns = model_data['feature_columns']
+    else:
+        df = pd.DataFrame([columns], columns=model_data['feature_columns'])
+    probability = score_frame(model_data, df)['probability'].astype(float)
+    return probability if batch else float(probability.iloc[0])
+
+def stage_manifest(session, model_stage=MODEL_STAGE):
+    """The manifest of the model on the stage (a few hundred bytes)"""
+    return json.loads(session.file.get_stream(f'{model_stage}/manifest.json').read())
+
+def deploy_procedure(session, model_stage=MODEL_STAGE, permanent=True):
+    """Register TRAIN_AVAILABILITY_MODEL(relation, model_stage) with the ml/ modules it needs
+
+    permanent=False registers it for this session only (all the local testing session supports).
+    """
+    from snowflake.snowpark.types import StringType
+
+    session.sproc.register(
+        train_in_warehouse, name=PROCEDURE_NAME, return_type=StringType(),
+        input_types=[StringType(), StringType()], imports=_module_files(PROCEDURE_MODULES),
+        packages=PACKAGES, is_permanent=permanent, stage_location=model_stage.split('/')[0] if permanent else None,
+        replace=True
+    )
+    print(f"Registered procedure {PROCEDURE_NAME}")
+
+def deploy_udf(session, feature_cols, model_stage=MODEL_STAGE, permanent=True):
+    """Register PREDICT_AVAILABILITY over feature_cols, importing the staged artifact"""
+    from snowflake.snowpark.functions import pandas_udf
+    from snowflake.snowpark.types import DoubleType, PandasSeriesType
+
+    udf = pandas_udf(
+        predict_availability, name=UDF_NAME, return_type=PandasSeriesType(DoubleType()),
+        input_types=[PandasSeriesType(DoubleType())] * len(feature_cols),
+        imports=_module_files(UDF_MODULES) + [f'{model_stage}/manifest.json', f'{model_stage}/model.joblib'],
+        packages=PACKAGES, is_permanent=permanent, stage_location=model_stage.split('/')[0] if permanent else None,
+        replace=True, session=session
+    )
+    print(f"Registered vectorized UDF {UDF_NAME} over {len(feature_cols)} feature columns")
+    return udf
+
+def train(session, relation=FEATURES_TABLE, model_stage=MODEL_STAGE):
+    """CALL the training procedure; returns its summary"""
+    summary = json.loads(session.call(PROCEDURE_NAME, relation, model_stage))
+    accuracies = ', '.join(f"{name} {acc:.3f}" for name, acc in summary['accuracy'].items())
+    print(f"Trained {summary['model_name']} in the warehouse on {summary['rows']} rows ({accuracies})")
+    print(f"Artifact staged at {summary['model_stage']}")
+    return summary
+
+def score(session, relation=FEATURES_TABLE, model_stage=MODEL_STAGE, predictions_table=PREDICTIONS_TABLE,
+          permanent=True):
+    """Score relation with the staged model in the warehouse and overwrite predictions_table"""
+    from snowflake.snowpark.functions import col, iff, lit
+    from snowflake.snowpark.types import DoubleType
+
+    manifest = stage_manifest(session, model_stage)
+    feature_cols = manifest['feature_columns']
+    udf = deploy_udf(session, feature_cols, model_stage, permanent)
+
+    # Same columns as predict.batch_score_snowflake writes
+    features = session.table(relation)
+    scored = features.select(
+        *[col(c.upper()) for c in KEY_COLUMNS],
+        udf(*[col(c.upper()).cast(DoubleType()) for c in feature_cols]).alias('PROBABILITY')
+    )
+    scored = scored.select(
+        *[col(c.upper()) for c in KEY_COLUMNS],
+        iff(col('PROBABILITY') > 0.5, lit(1), lit(0)).alias('PREDICTION'),
+        col('PROBABILITY'),
+        lit(manifest['model_name']).alias('MODEL_NAME')
+    )
+    scored.write.save_as_table(predictions_table, mode='overwrite')
+    rows = session.table(predictions_table).count()
+    print(f"Scored {rows} rows with {manifest['model_name']} into {predictions_table}")
+    return rows
+
+def local_session(csv_path=None, workload_window=None):
+    """Snowpark local testing session with FEATURES_TABLE filled from the raw CSV"""
+    from snowflake.snowpark import Session
+    from features import DEFAULT_CSV_PATH, load_local_features
+    # The emulator unloads modules first imported inside a procedure or UDF call, and C extensions
+    # (NumPy, SciPy) cannot be loaded a second time: import everything the handlers need up front
+    import predict, train_model  # noqa: F401
+
+    session = Session.builder.config('local_testing', True).create()
+    features = load_local_features(csv_path or DEFAULT_CSV_PATH)
+    if workload_window:
+        from workload import compute_workload_features
+        features = compute_workload_features(features, workload_window)
+    features.columns = [c.upper() for c in features.columns]
+    session.create_dataframe(features).write.save_as_table(FEATURES_TABLE, mode='overwrite')
+    print(f"Local testing session: {len(features)} rows in {FEATURES_TABLE}")
+    return session
+
+def snowflake_session():
+    """Snowpark session with the same parameters as the connector pool"""
+    from snowflake.snowpark import Session
+    from connections import connection_params
+
+    return Session.builder.configs(connection_params('FEATURES')).create()
+
+def check_local_scores(session, model_stage=MODEL_STAGE, relation=FEATURES_TABLE,
+                       predictions_table=PREDICTIONS_TABLE, atol=1e-6):
+    """Compare the warehouse scores with predict.score_frame on the same rows and staged model"""
+    import tempfile
+    import numpy as np
+    from artifacts import load_artifact
+    from predict import score_frame
+
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        for name in ('model.joblib', 'manifest.json'):
+            with open(os.path.join(artifact_dir, name), 'wb') as f:
+                f.write(session.file.get_stream(f'{model_stage}/{name}').read())
+        model_data = load_artifact(artifact_dir, mmap=False)
+    expected = score_frame(model_data, _lower_numeric(session.table(relation).to_pandas()))
+    actual = _lower_numeric(session.table(predictions_table).to_pandas())
+    merged = expected.merge(actual, on=KEY_COLUMNS, suffixes=('', '_warehouse'))
+    ok = (len(merged) == len(expected) == len(actual)
+          and np.allclose(merged['probability'], merged['probability_warehouse'].astype(float), atol=atol)
+          and (merged['prediction'] == merged['prediction_warehouse']).all())
+    print(f"Warehouse scores vs score_frame on {len(merged)} rows: {'OK' if ok else 'MISMATCH'}")
+    return ok
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train and score the availability model inside Snowflake")
+    parser.add_argument('command', choices=['deploy', 'train', 'score', 'all'],
+                        help="deploy: register the procedure; train: CALL it; score: write predictions; all: each in turn")
+    parser.add_argument('--relation', default=FEATURES_TABLE,
+                        help="Feature table or view to train on and score (e.g. LITMANEN.FEATURES.WORKLOAD_FEATURES)")
+    parser.add_argument('--stage', default=MODEL_STAGE, help="Stage path of the model artifact")
+    parser.add_argument('--local', nargs='?', const='', metavar='CSV',
+                        help="Run on a Snowpark local testing session filled from the raw CSV, and check the scores")
+    parser.add_argument('--workload', nargs='?', type=int, const=3, metavar='SEASONS',
+                        help="With --local, add rolling workload features to the local feature table")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.local is not None:
+        session = local_session(args.local or None, args.workload)
+    else:
+        session = snowflake_session()
+    try:
+        if args.command in ('deploy', 'all'):
+            deploy_procedure(session, args.stage, permanent=args.local is None)
+        if args.command in ('train', 'all'):
+            train(session, args.relation, args.stage)
+        if args.command in ('score', 'all'):
+            score(session, args.relation, args.stage, permanent=args.local is None)
+            if args.local is not None and not check_local_scores(session, args.stage, args.relation):
+                raise SystemExit(1)
+    finally:
+        session.close()
@@ -0,0 +1,170 @@
+"""
+Rolling workload features - mirrors LITMANEN.FEATURES.WORKLOAD_FEATURES
+Adds history to each feature row: previous-season minutes, minutes over the previous N seasons,
+this season's load against that, the start/appearance ratio trend and club-change flags.
+One sort by (player_id, season_start_year), then cumulative sums and shifts over the sorted
+player-seasons - no per-player loops. The SQL form is queries.build_workload_query().
+"""
+import argparse
+import os
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from features import DEFAULT_CSV_PATH, FEATURE_COLUMNS, compute_features, load_local_features, synthetic_raw_data
+from queries import WORKLOAD_COLUMNS, build_workload_query
+
+DEFAULT_WINDOW = 3
+
+WORKLOAD_SQL_PATH = os.path.join(os.path.dirname(__file__), '..', 'snowflake', '08_create_workload_features.sql')
+
+def _window_sums(keys, values, window):
+    """Sum of values over keys in [key - window, key - 1]; keys sorted and unique, as RANGE frames see them"""
+    cumulative = np.concatenate([[0], np.cumsum(values)])
+    start = np.searchsorted(keys, keys - window, side='left')
+    return cumulative[:-1] - cumulative[start]
+
+def compute_workload_features(features_df, window=DEFAULT_WINDOW, year_min=None):
+    """Feature rows plus WORKLOAD_COLUMNS, looking back `window` seasons per player
+
+    With year_min only rows from that season on are returned, computed from the `window`
+    seasons before it - the same bounded history build_workload_query reads.
+    """
+    df = features_df[features_df['season_start_year'].notna()]
+    if year_min is not None:
+        df = df[df['season_start_year'] >= year_min - max(window, 1)]
+    df = df.astype({'season_start_year': 'int64'})
+
+    # Player-seasons, sorted by player then season
+    seasons = df.groupby(['player_id', 'season_start_year'], sort=True).agg(
+        season_minutes=('minutes', 'sum'),
+        season_starts=('starts', 'sum'),
+        season_appearances=('appearances', 'sum'),
+        season_clubs=('club', 'nunique'),
+    ).reset_index()
+    player_code = pd.factorize(seasons['player_id'])[0]
+    year = seasons['season_start_year'].to_numpy()
+
+    # Previous calendar season of the same player
+    same_player = np.r_[False, player_code[1:] == player_code[:-1]]
+    played_prev = same_player & (np.r_[0, year[:-1]] == year - 1)
+    seasons['played_prev'] = played_prev
+    seasons['prev_season_minutes'] = np.where(played_prev, np.r_[0, seasons['season_minutes'].to_numpy()[:-1]], 0)
+
+    # Rolling sums over the previous `window` seasons: one key per player-season, players spaced
+    # further apart than the window so a frame never reaches into the previous player
+    span = int(year.max() - year.min()) + window + 2 if len(year) else 0
+    keys = player_code.astype('int64') * span + (year - (year.min() if len(year) else 0))
+    seasons['rolling_minutes'] = _window_sums(keys, seasons['season_minutes'].to_numpy(dtype='float64'), window)
+    rolling_starts = _window_sums(keys, seasons['season_starts'].to_numpy(dtype='float64'), window)
+    rolling_appearances = _window_sums(keys, seasons['season_appearances'].to_numpy(dtype='float64'), window)
+
+    rolling = seasons['rolling_minutes'].where(seasons['rolling_minutes'] != 0)
+    seasons['load_spike'] = seasons['season_minutes'] * float(window) / rolling
+    season_rate = seasons['season_starts'] / seasons['season_appearances'].where(seasons['season_appearances'] != 0)
+    rolling_rate = rolling_starts / np.where(rolling_appearances != 0, rolling_appearances, np.nan)
+    seasons['start_ratio_trend'] = season_rate - rolling_rate
+    seasons['multi_club_season'] = (seasons['season_clubs'] > 1).astype(int)
+
+    result = df.merge(
+        seasons[['player_id', 'season_start_year', 'played_prev', 'prev_season_minutes', 'rolling_minutes',
+                 'load_spike', 'start_ratio_trend', 'multi_club_season']],
+        on=['player_id', 'season_start_year'], how='left'
+    )
+
+    # New club: the player played the previous season, but not for this club
+    previous_clubs = pd.MultiIndex.from_frame(
+        df[['player_id', 'season_start_year', 'club']].assign(season_start_year=df['season_start_year'] + 1)
+    )
+    at_club_before = pd.MultiIndex.from_frame(result[['player_id', 'season_start_year', 'club']]).isin(previous_clubs)
+    result['new_club'] = (result['played_prev'] & ~at_club_before).astype(int)
+
+    if year_min is not None:
+        result = result[result['season_start_year'] >= year_min]
+    return result[FEATURE_COLUMNS + WORKLOAD_COLUMNS].reset_index(drop=True)
+
+def compute_workload_sql(features_df, window=DEFAULT_WINDOW, year_min=None):
+    """Run build_workload_query on an in-memory SQLite copy of features_df"""
+    conn = sqlite3.connect(':memory:')
+    try:
+        features_df[FEATURE_COLUMNS].to_sql('litmanen_features', conn, index=False)
+        sql, params = build_workload_query('litmanen_features', window, year_min=year_min)
+        result = pd.read_sql_query(sql.replace('%s', '?'), conn, params=params)
+    finally:
+        conn.close()
+    return result[FEATURE_COLUMNS + WORKLOAD_COLUMNS]
+
+def check_parity(features_df, window=DEFAULT_WINDOW, year_min=None, atol=1e-9):
+    """Compare compute_workload_features against the SQL window form; returns True if identical"""
+    sort_cols = ['player_id', 'season', 'competition', 'club']
+    local = compute_workload_features(features_df, window, year_min).sort_values(sort_cols).reset_index(drop=True)
+    sql = compute_workload_sql(features_df, window, year_min).sort_values(sort_cols).reset_index(drop=True)
+    if len(local) != len(sql):
+        print(f"Row count mismatch: local {len(local)}, SQL {len(sql)}")
+        return False
+
+    ok = True
+    for col in WORKLOAD_COLUMNS:
+        left = local[col].astype('float64').to_numpy()
+        right = pd.to_numeric(sql[col], errors='coerce').astype('float64').to_numpy()
+        if not np.allclose(left, right, atol=atol, equal_nan=True):
+            print(f"Mismatch in column '{col}'")
+            ok = False
+    print(f"Workload parity check on {len(local)} rows (window {window}, year_min {year_min}): "
+          f"{'OK' if ok else 'FAILED'}")
+    return ok
+
+def check_view_file(path=WORKLOAD_SQL_PATH, window=DEFAULT_WINDOW):
+    """True if the deployed view's SELECT is build_workload_query(window) on LITMANEN_FEATURES"""
+    with open(path, 'r', encoding='utf-8') as f:
+        script = f.read()
+    expected, _ = build_workload_query('LITMANEN.FEATURES.LITMANEN_FEATURES', window, order_by=False)
+    ok = ' '.join(expected.split()) in ' '.join(script.split())
+    print(f"{path}: {'in sync' if ok else 'OUT OF SYNC'} with build_workload_query(window={window})")
+    return ok
+
+def benchmark(n_rows=1_000_000, n_players=10_000, window=DEFAULT_WINDOW, repeat=3):
+    """Time compute_workload_features on synthetic feature rows"""
+    features = compute_features(synthetic_raw_data(n_rows, n_players=n_players))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compute_workload_features(features, window)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"compute_workload_features on {len(features):,} rows ({n_players:,} players): best {best:.3f}s "
+          f"of {repeat} ({len(features) / best:,.0f} rows/sec)")
+    return best
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compute rolling workload features locally")
+    parser.add_argument('csv_path', nargs='?', default=DEFAULT_CSV_PATH, help="Raw season CSV")
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help="Seasons of history per row")
+    parser.add_argument('--output', help="Write features to this CSV (or .parquet) file")
+    parser.add_argument('--check-parity', action='store_true',
+                        help="Compare against the SQL window form (raw CSV and synthetic data)")
+    parser.add_argument('--benchmark', type=int, metavar='N_ROWS', help="Benchmark on N_ROWS synthetic rows")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.check_parity:
+        real = load_local_features(args.csv_path)
+        synthetic = compute_features(synthetic_raw_data(50_000, n_players=200))
+        ok = check_parity(real, args.window)
+        ok = check_parity(synthetic, args.window) and ok
+        ok = check_parity(synthetic, args.window, year_min=2000) and ok
+        ok = check_view_file() and ok
+        raise SystemExit(0 if ok else 1)
+    if args.benchmark:
+        benchmark(args.benchmark, window=args.window)
+    else:
+        features = compute_workload_features(load_local_features(args.csv_path), args.window)
+        if args.output and args.output.endswith('.parquet'):
+            features.to_parquet(args.output, index=False)
+            print(f"Wrote {len(features)} feature rows to {args.output}")
+        elif args.output:
+            features.to_csv(args.output, index=False)
+            print(f"Wrote {len(features)} feature rows to {args.output}")
+        else:
+            print(features.to_string(index=False))
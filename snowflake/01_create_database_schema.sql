@@ -7,6 +7,9 @@ CREATE SCHEMA IF NOT EXISTS LITMANEN.FEATURES;
 CREATE OR REPLACE STAGE LITMANEN.RAW.STAGE_CSV;
 
 -- Step 22: Create raw table
+-- player_id keys each row to a player so squads and leagues can share the table; files without
+-- the column load as 'litmanen'. Clustering keeps each player's seasons in their own
+-- micro-partitions, so player-scoped queries prune the rest.
 CREATE OR REPLACE TABLE LITMANEN.RAW.PLAYER_SEASON_DATA (
   season STRING,
   competition STRING,
@@ -14,6 +17,12 @@ CREATE OR REPLACE TABLE LITMANEN.RAW.PLAYER_SEASON_DATA (
   appearances INT,
   starts INT,
   ppg NUMBER(10,2),
-  minutes INT
-);
+  minutes INT,
+  player_id STRING NOT NULL DEFAULT 'litmanen'
+)
+CLUSTER BY (player_id, season);
+
+-- Existing single-player deployments can migrate in place (same column order as above):
+-- ALTER TABLE LITMANEN.RAW.PLAYER_SEASON_DATA ADD COLUMN player_id STRING NOT NULL DEFAULT 'litmanen';
+-- ALTER TABLE LITMANEN.RAW.PLAYER_SEASON_DATA CLUSTER BY (player_id, season);
 
@@ -2,7 +2,8 @@
 -- Note: This assumes the CSV file has been uploaded to the stage
 -- Upload command: PUT file:///workspace/data/litmanen_career_dataset_full.csv @LITMANEN.RAW.STAGE_CSV;
 
-COPY INTO LITMANEN.RAW.PLAYER_SEASON_DATA
-FROM @LITMANEN.RAW.STAGE_CSV/litmanen_career_dataset_full.csv
+-- The CSV has no player_id column, so list the loaded columns and let player_id take its default
+COPY INTO LITMANEN.RAW.PLAYER_SEASON_DATA (season, competition, club, appearances, starts, ppg, minutes)
+FROM (SELECT $1, $2, $3, $4, $5, $6, $7 FROM @LITMANEN.RAW.STAGE_CSV/litmanen_career_dataset_full.csv)
 FILE_FORMAT = (TYPE = CSV FIELD_DELIMITER = ',' SKIP_HEADER = 1);
 
@@ -1,6 +1,7 @@
 -- Step 30: Create feature view
 CREATE OR REPLACE VIEW LITMANEN.FEATURES.LITMANEN_FEATURES AS
 SELECT
+  player_id,
   season,
   competition,
   club,
@@ -8,9 +9,9 @@ SELECT
   starts,
   ppg,
   minutes,
-  -- Calculate workload ratios
-  appearances * 1.0 / NULLIF(MAX(appearances) OVER (PARTITION BY competition, season), 0) AS appearance_ratio,
-  minutes * 1.0 / NULLIF(MAX(minutes) OVER (PARTITION BY competition, season), 0) AS minutes_ratio,
+  -- Calculate workload ratios (relative to the player's own busiest club in that competition and season)
+  appearances * 1.0 / NULLIF(MAX(appearances) OVER (PARTITION BY player_id, competition, season), 0) AS appearance_ratio,
+  minutes * 1.0 / NULLIF(MAX(minutes) OVER (PARTITION BY player_id, competition, season), 0) AS minutes_ratio,
   -- Derive season start year for sorting (handles formats like '11/12', '2001', '99/00')
   CASE 
     WHEN season LIKE '%/%' THEN 
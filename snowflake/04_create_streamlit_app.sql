@@ -8,7 +8,7 @@ CREATE OR REPLACE STREAMLIT LITMANEN.FEATURES.LITMANEN_CAREER_ANALYSIS
   QUERY_WAREHOUSE = 'COMPUTE_WH';  -- Replace with your warehouse name
 
 -- Note: After creating the app, you need to:
--- 1. Upload the app_snowflake.py file to the stage
+-- 1. Upload app_snowflake.py and dashboard.py to the stage
 -- 2. Grant permissions to users who should access it
 -- 3. Access via Snowsight: Apps > LITMANEN_CAREER_ANALYSIS
 
@@ -1,8 +1,10 @@
 -- Instructions for uploading Streamlit app to Snowflake
 -- Run these commands using SnowSQL or Snowflake CLI
 
--- Step 1: Upload the Streamlit app file to the stage
+-- Step 1: Upload the Streamlit app files to the stage
+-- app_snowflake.py is the entry point; dashboard.py holds the shared page code it imports
 -- PUT file:///workspace/streamlit/app_snowflake.py @LITMANEN.FEATURES.STREAMLIT_STAGE/app_snowflake.py;
+-- PUT file:///workspace/streamlit/dashboard.py @LITMANEN.FEATURES.STREAMLIT_STAGE/dashboard.py;
 
 -- Step 2: Verify the file was uploaded
 -- LIST @LITMANEN.FEATURES.STREAMLIT_STAGE;
@@ -10,4 +12,4 @@
 -- Step 3: The Streamlit app should now be accessible in Snowsight
 -- Navigate to: Apps > LITMANEN_CAREER_ANALYSIS
 
--- Note: If you need to update the app, upload the new version and refresh the app in Snowsight
+-- Note: If you need to update the app, upload the new version of both files and refresh the app in Snowsight
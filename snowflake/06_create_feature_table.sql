@@ -0,0 +1,95 @@
+-- Step 31: Materialized feature table with incremental refresh
+-- LITMANEN_FEATURES is a plain view, so every read re-runs both window functions over the
+-- whole raw table. This table stores the same columns; the refresh procedure recomputes only
+-- the (player_id, competition, season) partitions touched by raw rows changed since the last refresh.
+
+-- Change tracking on the raw table. Created before the fill, so no raw row committed in between
+-- is missed: a row in both the fill and the stream only has its partition recomputed once more.
+CREATE OR REPLACE STREAM LITMANEN.RAW.PLAYER_SEASON_DATA_STREAM
+COPY GRANTS
+ON TABLE LITMANEN.RAW.PLAYER_SEASON_DATA;
+
+-- Feature table, initially filled from the view. Clustered so per-player dashboards and
+-- training slices read only that player's micro-partitions. COPY GRANTS keeps the grants of
+-- the table it replaces.
+CREATE OR REPLACE TABLE LITMANEN.FEATURES.LITMANEN_FEATURES_TABLE
+CLUSTER BY (player_id, season_start_year)
+COPY GRANTS
+AS
+SELECT * FROM LITMANEN.FEATURES.LITMANEN_FEATURES;
+
+-- Partitions touched by the current refresh
+CREATE OR REPLACE TRANSIENT TABLE LITMANEN.FEATURES.FEATURE_REFRESH_PARTITIONS (
+  player_id STRING,
+  competition STRING,
+  season STRING
+);
+
+-- Incremental refresh: recompute touched (player_id, competition, season) partitions only.
+-- The window functions partition by (player_id, competition, season), so filtering the view on those
+-- columns gives exactly the rows a full recompute would produce for those partitions.
+CREATE OR REPLACE PROCEDURE LITMANEN.FEATURES.REFRESH_LITMANEN_FEATURES()
+RETURNS STRING
+LANGUAGE SQL
+AS
+$$
+DECLARE
+  partitions INT;
+  deleted INT;
+  inserted INT;
+BEGIN
+  BEGIN TRANSACTION;
+  
+  DELETE FROM LITMANEN.FEATURES.FEATURE_REFRESH_PARTITIONS;
+  
+  -- Consuming the stream in DML advances its offset when the transaction commits;
+  -- inserted, updated and deleted rows all mark their partition as touched
+  INSERT INTO LITMANEN.FEATURES.FEATURE_REFRESH_PARTITIONS (player_id, competition, season)
+  SELECT DISTINCT player_id, competition, season
+  FROM LITMANEN.RAW.PLAYER_SEASON_DATA_STREAM;
+  partitions := SQLROWCOUNT;
+  
+  DELETE FROM LITMANEN.FEATURES.LITMANEN_FEATURES_TABLE f
+  USING LITMANEN.FEATURES.FEATURE_REFRESH_PARTITIONS p
+  WHERE f.player_id = p.player_id
+    AND f.competition IS NOT DISTINCT FROM p.competition
+    AND f.season IS NOT DISTINCT FROM p.season;
+  deleted := SQLROWCOUNT;
+  
+  INSERT INTO LITMANEN.FEATURES.LITMANEN_FEATURES_TABLE
+  SELECT v.*
+  FROM LITMANEN.FEATURES.LITMANEN_FEATURES v
+  JOIN LITMANEN.FEATURES.FEATURE_REFRESH_PARTITIONS p
+    ON v.player_id = p.player_id
+   AND v.competition IS NOT DISTINCT FROM p.competition
+   AND v.season IS NOT DISTINCT FROM p.season;
+  inserted := SQLROWCOUNT;
+  
+  COMMIT;
+  RETURN 'partitions=' || partitions || ' deleted=' || deleted || ' inserted=' || inserted;
+END;
+$$;
+
+-- Optional: refresh automatically whenever the raw table changes
+CREATE OR REPLACE TASK LITMANEN.FEATURES.REFRESH_LITMANEN_FEATURES_TASK
+  WAREHOUSE = COMPUTE_WH  -- Replace with your warehouse name
+  SCHEDULE = '5 MINUTE'
+  WHEN SYSTEM$STREAM_HAS_DATA('LITMANEN.RAW.PLAYER_SEASON_DATA_STREAM')
+AS
+  CALL LITMANEN.FEATURES.REFRESH_LITMANEN_FEATURES();
+
+-- The task is created suspended; enable it with:
+-- ALTER TASK LITMANEN.FEATURES.REFRESH_LITMANEN_FEATURES_TASK RESUME;
+
+-- Alternative: dynamic table variant. Snowflake maintains it incrementally within TARGET_LAG
+-- (window functions with PARTITION BY are supported in incremental refresh mode).
+-- CREATE OR REPLACE DYNAMIC TABLE LITMANEN.FEATURES.LITMANEN_FEATURES_DT
+--   TARGET_LAG = '5 minutes'
+--   WAREHOUSE = COMPUTE_WH
+--   REFRESH_MODE = INCREMENTAL
+-- AS
+-- SELECT * FROM LITMANEN.FEATURES.LITMANEN_FEATURES;
+
+-- Verify the table matches the view (both counts should be 0)
+-- SELECT COUNT(*) FROM (SELECT * FROM LITMANEN.FEATURES.LITMANEN_FEATURES MINUS SELECT * FROM LITMANEN.FEATURES.LITMANEN_FEATURES_TABLE);
+-- SELECT COUNT(*) FROM (SELECT * FROM LITMANEN.FEATURES.LITMANEN_FEATURES_TABLE MINUS SELECT * FROM LITMANEN.FEATURES.LITMANEN_FEATURES);
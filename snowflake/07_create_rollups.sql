@@ -0,0 +1,57 @@
+-- Step 53: Pre-aggregated rollups for the dashboard charts
+-- One row per (player_id, club, competition, season_start_year) with additive sums and counts, so the
+-- "Appearances by Club" and "Performance by Competition" charts can be re-aggregated for any
+-- sidebar filter without touching the raw rows. Size is bounded by players x clubs x competitions x years.
+
+CREATE OR REPLACE DYNAMIC TABLE LITMANEN.FEATURES.FEATURE_ROLLUP
+  TARGET_LAG = '5 minutes'
+  WAREHOUSE = COMPUTE_WH  -- Replace with your warehouse name
+  CLUSTER BY (player_id, season_start_year)
+AS
+SELECT
+  player_id,
+  club,
+  competition,
+  season_start_year,
+  COUNT(*) AS row_count,
+  SUM(appearances) AS appearances,
+  SUM(minutes) AS minutes,
+  -- Means are rebuilt as SUM(x_sum) / SUM(x_count) after filtering
+  SUM(ppg) AS ppg_sum,
+  COUNT(ppg) AS ppg_count,
+  SUM(minutes_ratio) AS minutes_ratio_sum,
+  COUNT(minutes_ratio) AS minutes_ratio_count
+FROM LITMANEN.FEATURES.LITMANEN_FEATURES
+GROUP BY player_id, club, competition, season_start_year;
+
+-- Unfiltered rollups by a single dimension, across all players
+CREATE OR REPLACE VIEW LITMANEN.FEATURES.CLUB_ROLLUP AS
+SELECT
+  club,
+  SUM(appearances) AS appearances,
+  SUM(minutes) AS minutes,
+  SUM(ppg_sum) / NULLIF(SUM(ppg_count), 0) AS ppg
+FROM LITMANEN.FEATURES.FEATURE_ROLLUP
+GROUP BY club;
+
+CREATE OR REPLACE VIEW LITMANEN.FEATURES.COMPETITION_ROLLUP AS
+SELECT
+  competition,
+  SUM(minutes_ratio_sum) / NULLIF(SUM(minutes_ratio_count), 0) AS minutes_ratio,
+  SUM(ppg_sum) / NULLIF(SUM(ppg_count), 0) AS ppg,
+  SUM(appearances) AS appearances
+FROM LITMANEN.FEATURES.FEATURE_ROLLUP
+GROUP BY competition;
+
+CREATE OR REPLACE VIEW LITMANEN.FEATURES.SEASON_ROLLUP AS
+SELECT
+  season_start_year,
+  SUM(row_count) AS seasons,
+  SUM(appearances) AS appearances,
+  SUM(minutes) AS minutes,
+  SUM(minutes_ratio_sum) / NULLIF(SUM(minutes_ratio_count), 0) AS minutes_ratio
+FROM LITMANEN.FEATURES.FEATURE_ROLLUP
+GROUP BY season_start_year;
+
+-- Verify
+-- SELECT * FROM LITMANEN.FEATURES.CLUB_ROLLUP ORDER BY appearances DESC;
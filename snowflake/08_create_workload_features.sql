@@ -0,0 +1,47 @@
+-- Step 32: Rolling workload features
+-- One row per LITMANEN_FEATURES row plus its player's history: previous-season minutes (0 after a
+-- season without rows), minutes over the previous 3 seasons, this season's load against their mean,
+-- the season's start/appearance ratio minus that of the previous 3 seasons, and club-change flags.
+-- Windows run over player-seasons (one row per player and season_start_year), not over the raw rows.
+-- Generated from ml/queries.py build_workload_query(window=3); pulls with another window or a
+-- season filter use that function directly (python ml/workload.py --check-parity checks this file).
+
+CREATE OR REPLACE VIEW LITMANEN.FEATURES.WORKLOAD_FEATURES AS
+WITH history AS (
+  SELECT * FROM LITMANEN.FEATURES.LITMANEN_FEATURES
+),
+player_seasons AS (
+  SELECT player_id, season_start_year,
+         SUM(minutes) AS season_minutes,
+         SUM(starts) AS season_starts,
+         SUM(appearances) AS season_appearances,
+         COUNT(DISTINCT club) AS season_clubs
+  FROM history
+  GROUP BY player_id, season_start_year
+),
+season_windows AS (
+  SELECT player_id, season_start_year, season_minutes, season_starts, season_appearances, season_clubs,
+         CASE WHEN LAG(season_start_year) OVER (PARTITION BY player_id ORDER BY season_start_year) = season_start_year - 1 THEN 1 ELSE 0 END AS played_prev,
+         CASE WHEN LAG(season_start_year) OVER (PARTITION BY player_id ORDER BY season_start_year) = season_start_year - 1
+              THEN LAG(season_minutes) OVER (PARTITION BY player_id ORDER BY season_start_year) ELSE 0 END AS prev_season_minutes,
+         COALESCE(SUM(season_minutes) OVER (PARTITION BY player_id ORDER BY season_start_year RANGE BETWEEN 3 PRECEDING AND 1 PRECEDING), 0) AS rolling_minutes,
+         SUM(season_starts) OVER (PARTITION BY player_id ORDER BY season_start_year RANGE BETWEEN 3 PRECEDING AND 1 PRECEDING) AS rolling_starts,
+         SUM(season_appearances) OVER (PARTITION BY player_id ORDER BY season_start_year RANGE BETWEEN 3 PRECEDING AND 1 PRECEDING) AS rolling_appearances
+  FROM player_seasons
+),
+previous_clubs AS (
+  SELECT DISTINCT player_id, season_start_year + 1 AS season_start_year, club FROM history
+)
+SELECT f.player_id, f.season, f.club, f.competition, f.appearances, f.starts, f.ppg, f.minutes, f.appearance_ratio, f.minutes_ratio, f.season_start_year,
+  w.prev_season_minutes,
+  w.rolling_minutes,
+  w.season_minutes * 3.0 / NULLIF(w.rolling_minutes, 0) AS load_spike,
+  w.season_starts * 1.0 / NULLIF(w.season_appearances, 0)
+    - w.rolling_starts * 1.0 / NULLIF(w.rolling_appearances, 0) AS start_ratio_trend,
+  CASE WHEN w.played_prev = 1 AND p.club IS NULL THEN 1 ELSE 0 END AS new_club,
+  CASE WHEN w.season_clubs > 1 THEN 1 ELSE 0 END AS multi_club_season
+FROM history f
+JOIN season_windows w
+  ON f.player_id = w.player_id AND f.season_start_year = w.season_start_year
+LEFT JOIN previous_clubs p
+  ON f.player_id = p.player_id AND f.season_start_year = p.season_start_year AND f.club = p.club;
@@ -0,0 +1,23 @@
+-- Step 44: In-warehouse training and scoring
+-- Stage for the availability model artifact (manifest.json + model.joblib) and the code of the
+-- TRAIN_AVAILABILITY_MODEL procedure and PREDICT_AVAILABILITY vectorized UDF. Both are registered
+-- from ml/warehouse_ml.py (python ml/warehouse_ml.py deploy), which uploads the ml/ modules they import.
+
+CREATE STAGE IF NOT EXISTS LITMANEN.FEATURES.MODEL_STAGE
+  DIRECTORY = (ENABLE = TRUE)
+  COMMENT = 'Availability model artifacts and Snowpark code';
+
+-- Train the train_baseline_model candidates on the feature table; returns a JSON summary
+-- (use LITMANEN.FEATURES.WORKLOAD_FEATURES to train with the rolling workload features).
+-- The procedure exists only after python ml/warehouse_ml.py deploy; run that first, then:
+-- CALL LITMANEN.FEATURES.TRAIN_AVAILABILITY_MODEL(
+--   'LITMANEN.FEATURES.LITMANEN_FEATURES',
+--   '@LITMANEN.FEATURES.MODEL_STAGE/availability'
+-- );
+
+-- Scoring registers PREDICT_AVAILABILITY over the staged model's feature columns and rewrites
+-- AVAILABILITY_PREDICTIONS (python ml/warehouse_ml.py score). Once registered, ad hoc scoring in SQL:
+-- SELECT player_id, season, competition, club,
+--        LITMANEN.FEATURES.PREDICT_AVAILABILITY(appearances, starts, ppg, minutes, appearance_ratio,
+--                                               minutes_ratio, season_start_year) AS probability
+-- FROM LITMANEN.FEATURES.LITMANEN_FEATURES;
@@ -1,258 +1,275 @@
 """
 Streamlit App - Step 50-52
 Connect to Snowflake, query features, create charts + narrative
+The page itself lives in dashboard.py; this script picks the data backend.
 """
+import time
+SCRIPT_START = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
 import os
-from dotenv import load_dotenv
-import snowflake.connector
+import sys
+import threading
 
-# Load environment variables
-load_dotenv()
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml'))
+import dashboard
+from feature_cache import SnapshotStore, probe_freshness
+from queries import build_features_query, build_filter_options_query, build_rollup_query
 
-# Page configuration
-st.set_page_config(
-    page_title="Jari Litmanen Career Analysis",
-    page_icon="⚽",
-    layout="wide",
-    initial_sidebar_state="expanded"
+# View or materialized table (snowflake/06_create_feature_table.sql) to read features from
+FEATURES_RELATION = os.getenv('LITMANEN_FEATURES_RELATION', 'LITMANEN.FEATURES.LITMANEN_FEATURES')
+
+# Pre-aggregated chart rollups (snowflake/07_create_rollups.sql)
+ROLLUP_RELATION = os.getenv('LITMANEN_ROLLUP_RELATION', 'LITMANEN.FEATURES.FEATURE_ROLLUP')
+
+# Query-builder mode: apply sidebar filters in Snowflake instead of on the full pandas frame
+PUSHDOWN_FILTERS = os.getenv('LITMANEN_PUSHDOWN_FILTERS', '1') == '1'
+
+# Fast start (opt-in): serve a local Parquet snapshot of the features and refresh it from Snowflake in the
+# background. Pushdown filters, rollups and the shared result cache are not used while it serves.
+FAST_START = os.getenv('LITMANEN_FAST_START', '0') == '1'
+SNAPSHOT_PATH = os.getenv(
+    'LITMANEN_SNAPSHOT_PATH',
+    os.path.join(os.path.dirname(__file__), '.snapshot', 'litmanen_features.parquet')
 )
+SNAPSHOT_MAX_AGE = int(os.getenv('LITMANEN_SNAPSHOT_MAX_AGE', '300'))  # seconds
+
+# Shared result cache: Snowflake query results as Parquet files keyed by query and freshness token,
+# one directory for every Streamlit worker on the host
+SHARED_CACHE = os.getenv('LITMANEN_SHARED_CACHE', '1') == '1'
+RESULT_CACHE_DIR = os.getenv(
+    'LITMANEN_RESULT_CACHE_DIR',
+    os.path.join(os.path.dirname(__file__), '.result_cache')
+)
+RESULT_CACHE_MAX_MB = int(os.getenv('LITMANEN_RESULT_CACHE_MAX_MB', '256'))
+
+# Page configuration
+dashboard.setup_page()
+
+@st.cache_resource
+def get_connection_pool():
+    """Snowflake connection pool shared by all sessions and reruns of this server"""
+    from connections import create_pool  # Deferred: the connector is slow to import
+    return create_pool('FEATURES', max_size=4)
+
+@st.cache_resource
+def get_result_store():
+    """The shared result cache; one per server process, counting that process's hits and misses"""
+    return SnapshotStore(RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB * 1024 * 1024)
+
+class LocalBackend(dashboard.Backend):
+    """Features from a local file: a raw season CSV, or a feature CSV/Parquet snapshot"""
+    footer = 'Streamlit, Plotly (local data)'
+
+    def __init__(self, path):
+        self.path = path
+        self.key = f"local:{path}"
+
+    def freshness(self):
+        stat = os.stat(self.path)
+        return f"{stat.st_mtime_ns}|{stat.st_size}"
+
+    def load_all(self):
+        try:
+            if self.path.endswith('.parquet'):
+                return pd.read_parquet(self.path)
+            from features import FEATURE_COLUMNS, load_local_features
+            header = pd.read_csv(self.path, nrows=0).columns
+            if set(FEATURE_COLUMNS) - {'player_id'} <= set(header):
+                return pd.read_csv(self.path)
+            return load_local_features(self.path)
+        except Exception as e:
+            dashboard.show_error("Error loading local data", e)
+            return None
+
+class SnapshotBackend(LocalBackend):
+    """LocalBackend over the fast-start snapshot; the key follows the file so a refresh invalidates caches"""
+    footer = 'Snowflake (local snapshot), Streamlit, Plotly'
+
+    def __init__(self, path, refresher):
+        super().__init__(path)
+        self.refresher = refresher
+        self.key = f"snapshot:{path}:{os.path.getmtime(path)}"
+
+    def caption(self):
+        return self.refresher.status()
+
+class SnapshotRefresher:
+    """Rewrites the Parquet snapshot from Snowflake on a background thread, one refresh at a time,
+    and only when the relation's freshness token has changed"""
 
-# Custom CSS
-st.markdown("""
-    <style>
-    .main-header {
-        font-size: 3rem;
-        font-weight: bold;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .sub-header {
-        font-size: 1.5rem;
-        color: #666;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .metric-card {
-        background-color: #f0f2f6;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin: 0.5rem 0;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-def get_snowflake_connection():
-    """Create Snowflake connection"""
-    try:
-        conn = snowflake.connector.connect(
-            account=os.getenv('SNOWFLAKE_ACCOUNT'),
-            user=os.getenv('SNOWFLAKE_USER'),
-            password=os.getenv('SNOWFLAKE_PASSWORD'),
-            warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-            database='LITMANEN',
-            schema='FEATURES',
-            role=os.getenv('SNOWFLAKE_ROLE', 'ACCOUNTADMIN')
+    def __init__(self, path, relation):
+        self.path = path
+        self.relation = relation
+        self.token_path = path + '.token'
+        self.thread = None
+        self.last_error = None
+        self.lock = threading.Lock()
+
+    def age(self):
+        """Seconds since the snapshot was written, None if there is none"""
+        return time.time() - os.path.getmtime(self.path) if os.path.exists(self.path) else None
+
+    def refreshing(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def maybe_refresh(self, max_age):
+        """Start a background freshness check if the snapshot is missing or older than max_age"""
+        with self.lock:
+            age = self.age()
+            if self.refreshing() or (age is not None and age < max_age):
+                return
+            self.thread = threading.Thread(target=self._refresh, name='snapshot-refresh', daemon=True)
+            self.thread.start()
+
+    def _stored_token(self):
+        """Freshness token the snapshot was written at, None if unknown"""
+        try:
+            with open(self.token_path) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _refresh(self):
+        """Probe the freshness token; re-read the relation only if it changed since the snapshot"""
+        try:
+            query, _ = build_features_query(self.relation)
+            with get_connection_pool().connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    token = probe_freshness(cursor, self.relation)
+                    if os.path.exists(self.path) and token == self._stored_token():
+                        os.utime(self.path)  # Unchanged: restart the age clock without re-pulling
+                        self.last_error = None
+                        return
+                    cursor.execute(query)
+                    df = pd.DataFrame(cursor.fetchall(), columns=[desc[0].lower() for desc in cursor.description])
+                finally:
+                    cursor.close()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            dashboard.normalize_types(df).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self.path)
+            with open(self.token_path, 'w') as f:
+                f.write(token)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+
+    def status(self):
+        """Sidebar line: snapshot age and refresh state"""
+        age = self.age()
+        status = "Snapshot: none" if age is None else f"Snapshot age: {age:.0f}s"
+        if self.refreshing():
+            status += " (refreshing from Snowflake)"
+        elif self.last_error:
+            status += f" (last refresh failed: {self.last_error})"
+        return status
+
+@st.cache_resource
+def get_snapshot_refresher():
+    """One snapshot refresher per server process"""
+    return SnapshotRefresher(SNAPSHOT_PATH, FEATURES_RELATION)
+
+class ConnectorBackend(dashboard.Backend):
+    """Features through the Python connector; pushdown mode filters and aggregates in Snowflake"""
+
+    def __init__(self, relation, rollup_relation, pushdown):
+        self.relation = relation
+        self.rollup_relation = rollup_relation
+        self.pushdown = pushdown
+        self.key = f"connector:{relation}:{rollup_relation}:{pushdown}"
+
+    def freshness(self):
+        """Row count, max season and last-altered times of the raw table, features and rollup
+        (feature_cache.probe_freshness)"""
+        with get_connection_pool().connection() as conn:
+            cursor = conn.cursor()
+            try:
+                also_read = [self.rollup_relation] if self.pushdown else []
+                return probe_freshness(cursor, self.relation, also_read=also_read)
+            finally:
+                cursor.close()
+
+    def _query_frame(self, sql, params=None, quiet=False):
+        """Query result from the shared result cache, or from Snowflake when the data has changed"""
+        if not SHARED_CACHE or self.version is None:
+            return self._run_query(sql, params, quiet)
+        return get_result_store().get_or_load(
+            f"{sql} {params}", self.version, lambda: self._run_query(sql, params, quiet)
         )
-        return conn
-    except Exception as e:
-        st.error(f"Error connecting to Snowflake: {e}")
-        st.info("Note: If using Snowflake MCP server, you may need to configure .env file")
-        return None
-
-@st.cache_data(ttl=300)
-def load_data():
-    """Load data from Snowflake"""
-    conn = get_snowflake_connection()
-    if conn is None:
-        return None
-    
-    try:
-        cursor = conn.cursor()
-        query = """
-        SELECT 
-            season,
-            club,
-            competition,
-            appearances,
-            starts,
-            ppg,
-            minutes,
-            appearance_ratio,
-            minutes_ratio,
-            season_start_year
-        FROM LITMANEN.FEATURES.LITMANEN_FEATURES
-        ORDER BY season_start_year
-        """
-        cursor.execute(query)
-        columns = [desc[0] for desc in cursor.description]
-        data = cursor.fetchall()
-        df = pd.DataFrame(data, columns=columns)
-        cursor.close()
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return None
-    finally:
-        conn.close()
+
+    def _run_query(self, sql, params=None, quiet=False):
+        """Run a query on a pooled connection and return a DataFrame (None on error)"""
+        try:
+            conn = get_connection_pool().acquire(timeout=30)
+        except Exception as e:
+            st.error(f"Error connecting to Snowflake: {e}")
+            st.info("Note: If using Snowflake MCP server, you may need to configure .env file")
+            return None
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            columns = [desc[0].lower() for desc in cursor.description]
+            df = pd.DataFrame(cursor.fetchall(), columns=columns)
+            cursor.close()
+            return df
+        except Exception as e:
+            if not quiet:
+                st.error(f"Error loading data: {e}")
+            return None
+        finally:
+            get_connection_pool().release(conn)
+
+    def load_all(self):
+        query, _ = build_features_query(self.relation)
+        return self._query_frame(query)
+
+    def load_options(self):
+        if not self.pushdown:
+            return super().load_options()
+        return self._query_frame(build_filter_options_query(self.relation))
+
+    def load_rows(self, club, competition, year_min, year_max, player='All'):
+        if not self.pushdown:
+            return super().load_rows(club, competition, year_min, year_max, player)
+        query, params = build_features_query(self.relation, club, competition, year_min, year_max, player)
+        return self._query_frame(query, params)
+
+    def load_rollup(self, group_col, club, competition, year_min, year_max, player='All'):
+        # Quiet: without the rollup deployed the charts aggregate the filtered rows instead
+        if not self.pushdown:
+            return None
+        query, params = build_rollup_query(self.rollup_relation, group_col, club, competition, year_min, year_max, player)
+        return self._query_frame(query, params, quiet=True)
+
+    def caption(self):
+        caption = f"Snowflake connections: {get_connection_pool().summary()}"
+        if SHARED_CACHE:
+            caption += f"  \nResult cache: {get_result_store().summary()}"
+        return caption
+
+def get_backend():
+    """
+    Local file if LITMANEN_LOCAL_CSV / LITMANEN_LOCAL_PARQUET is set. Otherwise, in (opt-in) fast-start
+    mode, the snapshot (refreshed in the background when stale), and Snowflake directly until a
+    first snapshot exists.
+    """
+    local_path = os.getenv('LITMANEN_LOCAL_PARQUET') or os.getenv('LITMANEN_LOCAL_CSV')
+    if local_path:
+        return LocalBackend(local_path)
+    if FAST_START:
+        refresher = get_snapshot_refresher()
+        refresher.maybe_refresh(SNAPSHOT_MAX_AGE)
+        if os.path.exists(SNAPSHOT_PATH):
+            return SnapshotBackend(SNAPSHOT_PATH, refresher)
+    return ConnectorBackend(FEATURES_RELATION, ROLLUP_RELATION, PUSHDOWN_FILTERS)
 
 def main():
     """Main Streamlit app"""
-    # Header
-    st.markdown('<div class="main-header">⚽ Jari Litmanen Career Analysis</div>', unsafe_allow_html=True)
-    st.markdown('<div class="sub-header">ML-Powered Career Statistics & Availability Analysis</div>', unsafe_allow_html=True)
-    
-    # Load data
-    df = load_data()
-    
-    if df is None:
-        st.stop()
-    
-    # Sidebar
-    st.sidebar.header("Filters")
-    
-    # Club filter
-    clubs = ['All'] + sorted(df['club'].unique().tolist())
-    selected_club = st.sidebar.selectbox("Select Club", clubs)
-    
-    # Competition filter
-    competitions = ['All'] + sorted(df['competition'].unique().tolist())
-    selected_competition = st.sidebar.selectbox("Select Competition", competitions)
-    
-    # Year range filter
-    min_year = int(df['season_start_year'].min())
-    max_year = int(df['season_start_year'].max())
-    year_range = st.sidebar.slider("Season Range", min_year, max_year, (min_year, max_year))
-    
-    # Filter data
-    filtered_df = df[
-        (df['season_start_year'] >= year_range[0]) &
-        (df['season_start_year'] <= year_range[1])
-    ]
-    
-    if selected_club != 'All':
-        filtered_df = filtered_df[filtered_df['club'] == selected_club]
-    
-    if selected_competition != 'All':
-        filtered_df = filtered_df[filtered_df['competition'] == selected_competition]
-    
-    # Key Metrics
-    st.header("📊 Key Metrics")
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric("Total Seasons", len(filtered_df))
-    with col2:
-        st.metric("Total Appearances", int(filtered_df['appearances'].sum()))
-    with col3:
-        st.metric("Total Minutes", f"{int(filtered_df['minutes'].sum()):,}")
-    with col4:
-        st.metric("Avg Points/Game", f"{filtered_df['ppg'].mean():.2f}")
-    
-    # Chart 1: Minutes Ratio Over Time
-    st.header("📈 Career Timeline: Minutes Ratio")
-    fig1 = px.line(
-        filtered_df,
-        x='season_start_year',
-        y='minutes_ratio',
-        color='club',
-        markers=True,
-        title='Minutes Ratio by Season',
-        labels={'season_start_year': 'Season Start Year', 'minutes_ratio': 'Minutes Ratio'}
-    )
-    fig1.add_hline(y=0.4, line_dash="dash", line_color="red", 
-                   annotation_text="Low Availability Threshold (0.4)")
-    st.plotly_chart(fig1, use_container_width=True)
-    
-    # Chart 2: Appearances by Club
-    st.header("🏆 Appearances by Club")
-    club_stats = filtered_df.groupby('club').agg({
-        'appearances': 'sum',
-        'minutes': 'sum',
-        'ppg': 'mean'
-    }).reset_index().sort_values('appearances', ascending=False)
-    
-    fig2 = px.bar(
-        club_stats,
-        x='club',
-        y='appearances',
-        title='Total Appearances by Club',
-        labels={'appearances': 'Total Appearances', 'club': 'Club'}
-    )
-    st.plotly_chart(fig2, use_container_width=True)
-    
-    # Chart 3: Performance by Competition
-    st.header("🎯 Performance by Competition")
-    comp_stats = filtered_df.groupby('competition').agg({
-        'minutes_ratio': 'mean',
-        'ppg': 'mean',
-        'appearances': 'sum'
-    }).reset_index().sort_values('minutes_ratio', ascending=False)
-    
-    fig3 = px.scatter(
-        comp_stats,
-        x='minutes_ratio',
-        y='ppg',
-        size='appearances',
-        hover_name='competition',
-        title='Performance by Competition',
-        labels={'minutes_ratio': 'Average Minutes Ratio', 'ppg': 'Average Points per Game'}
-    )
-    st.plotly_chart(fig3, use_container_width=True)
-    
-    # Step 51: What ML Cannot Predict - Unusual Injuries Section
-    st.header("🚑 What ML Cannot Predict: Unusual Injuries & Anomalies")
-    st.markdown("""
-    ### The Human Element in Sports Analytics
-    
-    While machine learning models can predict availability based on workload patterns, 
-    they cannot account for the unpredictable nature of injuries, especially unusual ones.
-    
-    **Known Anomalies in Jari Litmanen's Career:**
-    - **1999-2000**: Transfer to Barcelona, limited playing time despite high performance
-    - **2000-2001**: Brief return to Barcelona, then move to Liverpool mid-season
-    - **2004-2005**: Return to Finland, playing in Bundesliga with Hansa Rostock
-    - **Various seasons**: Unusual injury patterns that don't correlate with workload
-    
-    These anomalies highlight the limitations of purely data-driven predictions in sports.
-    """)
-    
-    # Highlight anomalies in the data
-    st.subheader("📉 Low Availability Periods")
-    low_availability = filtered_df[filtered_df['minutes_ratio'] < 0.4].copy()
-    
-    if len(low_availability) > 0:
-        anomaly_df = low_availability[['season', 'club', 'competition', 'minutes_ratio', 'ppg']].sort_values('season_start_year')
-        st.dataframe(anomaly_df, use_container_width=True)
-        
-        st.markdown("""
-        **Analysis**: These low-availability periods may not always correlate with 
-        workload patterns, demonstrating the complexity of predicting athlete availability.
-        """)
-    else:
-        st.info("No low availability periods found in the filtered data.")
-    
-    # Data Table
-    st.header("📋 Detailed Data")
-    st.dataframe(
-        filtered_df[['season', 'club', 'competition', 'appearances', 'minutes', 'ppg', 
-                    'minutes_ratio', 'season_start_year']].sort_values('season_start_year'),
-        use_container_width=True,
-        height=400
-    )
-    
-    # Footer
-    st.markdown("---")
-    st.markdown("""
-    **Data Source**: Jari Litmanen Career Statistics (1990-2011)  
-    **Analysis**: ML-powered availability prediction with anomaly detection  
-    **Built with**: Snowflake, Streamlit, Plotly
-    """)
+    dashboard.run(get_backend(), started=SCRIPT_START)
 
 if __name__ == "__main__":
     main()
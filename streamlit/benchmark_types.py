@@ -0,0 +1,99 @@
+"""
+Benchmark for the dashboard's type normalization
+Runs the dashboard's data work (filter, metrics, chart frames, groupbys, tables) on a
+synthetic feature frame twice: once the old way, converting columns with pd.to_numeric at
+every use as app_snowflake.py used to, and once through dashboard.py on a frame cast by
+normalize_types() at load. Reports rerun time and frame memory for both.
+
+Usage: python streamlit/benchmark_types.py --rows 200000 --reruns 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml'))
+sys.path.insert(0, os.path.dirname(__file__))
+from dashboard import compute_view, filter_frame, normalize_types
+from features import compute_features, synthetic_raw_data
+
+
+def synthetic_snowpark_frame(n_rows):
+    """Feature frame shaped like Snowpark's to_pandas(): upper-case names, int64/float64/object"""
+    df = compute_features(synthetic_raw_data(n_rows))
+    df['season_start_year'] = df['season_start_year'].astype('float64')
+    df.columns = [c.upper() for c in df.columns]
+    for col_name in ('SEASON', 'CLUB', 'COMPETITION'):
+        df[col_name] = df[col_name].astype(object)
+    return df
+
+
+def legacy_rerun(df, club, year_min, year_max):
+    """Per-use conversions as app_snowflake.py did them before normalize_types()"""
+    year = pd.to_numeric(df['SEASON_START_YEAR'], errors='coerce').fillna(0)
+    f = df[(year >= year_min) & (year <= year_max)].copy()
+    f = f[f['CLUB'] == club]
+    pd.to_numeric(f['APPEARANCES'], errors='coerce').fillna(0).sum()
+    pd.to_numeric(f['MINUTES'], errors='coerce').fillna(0).sum()
+    pd.to_numeric(f['PPG'], errors='coerce').fillna(0).mean()
+    chart = f[['SEASON_START_YEAR', 'MINUTES_RATIO', 'CLUB']].copy()
+    chart['SEASON_START_YEAR'] = pd.to_numeric(chart['SEASON_START_YEAR'], errors='coerce')
+    chart['MINUTES_RATIO'] = pd.to_numeric(chart['MINUTES_RATIO'], errors='coerce')
+    chart.dropna(subset=['SEASON_START_YEAR', 'MINUTES_RATIO'])
+    f.groupby('CLUB').agg({
+        'APPEARANCES': lambda x: pd.to_numeric(x, errors='coerce').fillna(0).sum(),
+        'MINUTES': lambda x: pd.to_numeric(x, errors='coerce').fillna(0).sum(),
+        'PPG': lambda x: pd.to_numeric(x, errors='coerce').fillna(0).mean()
+    })
+    f.groupby('COMPETITION').agg({
+        'MINUTES_RATIO': lambda x: pd.to_numeric(x, errors='coerce').fillna(0).mean(),
+        'PPG': lambda x: pd.to_numeric(x, errors='coerce').fillna(0).mean(),
+        'APPEARANCES': lambda x: pd.to_numeric(x, errors='coerce').fillna(0).sum()
+    })
+    ratio = pd.to_numeric(f['MINUTES_RATIO'], errors='coerce').fillna(1.0)
+    f[ratio < 0.4].copy()
+    display = f[['SEASON', 'CLUB', 'COMPETITION', 'APPEARANCES', 'MINUTES', 'PPG', 'MINUTES_RATIO', 'SEASON_START_YEAR']].copy()
+    display['SEASON_START_YEAR'] = pd.to_numeric(display['SEASON_START_YEAR'], errors='coerce')
+    display.sort_values('SEASON_START_YEAR')
+
+
+def typed_rerun(df, club, year_min, year_max):
+    """The same work on a normalized frame, through the dashboard core"""
+    compute_view(filter_frame(df, club, 'All', year_min, year_max))
+
+
+def _time_reruns(rerun, df, reruns):
+    club = df['CLUB' if 'CLUB' in df.columns else 'club'].iloc[0]
+    start = time.perf_counter()
+    for _ in range(reruns):
+        rerun(df, club, 1995, 2005)
+    return (time.perf_counter() - start) / reruns
+
+
+def benchmark(n_rows=200000, reruns=20):
+    """Print per-rerun time and frame memory before and after normalize_types()"""
+    raw = synthetic_snowpark_frame(n_rows)
+    raw_mb = raw.memory_usage(deep=True).sum() / 1e6
+    start = time.perf_counter()
+    typed = normalize_types(raw.copy())
+    normalize_seconds = time.perf_counter() - start
+    typed_mb = typed.memory_usage(deep=True).sum() / 1e6
+
+    legacy_seconds = _time_reruns(legacy_rerun, raw, reruns)
+    typed_seconds = _time_reruns(typed_rerun, typed, reruns)
+
+    print(f"Rows: {n_rows:,}  reruns: {reruns}")
+    print(f"Frame memory: {raw_mb:.1f} MB -> {typed_mb:.1f} MB ({raw_mb / typed_mb:.1f}x smaller)")
+    print(f"One-off normalize_types: {normalize_seconds * 1000:.1f} ms")
+    print(f"Rerun: {legacy_seconds * 1000:.1f} ms -> {typed_seconds * 1000:.1f} ms "
+          f"({legacy_seconds / typed_seconds:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark dashboard type normalization')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--reruns', type=int, default=20)
+    args = parser.parse_args()
+    benchmark(args.rows, args.reruns)
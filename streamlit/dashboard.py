@@ -0,0 +1,406 @@
+"""
+Dashboard core shared by app.py and app_snowflake.py
+Filters, metrics, charts and tables live here once. Each entry script supplies a backend
+that only knows how to fetch data (local file, Snowflake connector or Snowpark session).
+Kept free of ml/ imports so it can be uploaded to the Streamlit stage next to app_snowflake.py.
+"""
+import os
+import sys
+import time
+import traceback
+
+import pandas as pd
+import streamlit as st
+
+# Dtypes the dashboard works with after load: counts are int32 with nulls as 0, ratios float32 with
+# nulls kept as NaN, names categorical. Everything downstream relies on these without converting.
+COLUMN_SCHEMA = {
+    'player_id': 'category',
+    'season': 'category',
+    'club': 'category',
+    'competition': 'category',
+    'appearances': 'int32',
+    'starts': 'int32',
+    'minutes': 'int32',
+    'season_start_year': 'int32',
+    'min_year': 'int32',
+    'max_year': 'int32',
+    'ppg': 'float32',
+    'appearance_ratio': 'float32',
+    'minutes_ratio': 'float32',
+    'probability': 'float32',
+}
+
+FEATURE_COLUMNS = [
+    'player_id', 'season', 'club', 'competition', 'appearances', 'starts', 'ppg', 'minutes',
+    'appearance_ratio', 'minutes_ratio', 'season_start_year'
+]
+DISPLAY_COLUMNS = ['season', 'club', 'competition', 'appearances', 'minutes', 'ppg', 'minutes_ratio', 'season_start_year']
+# Model scores, shown when the backend joins them in (app_snowflake.py and AVAILABILITY_PREDICTIONS)
+PREDICTION_COLUMNS = ['probability']
+
+LOW_AVAILABILITY_THRESHOLD = 0.4
+
+# Timing hook: print per-phase timings of each run to stderr and show them in the sidebar
+TIMING = os.getenv('LITMANEN_TIMING') == '1'
+
+# Seconds between freshness probes. Cached frames are keyed by the backend's freshness token, so they
+# are reused for as long as the source is unchanged and dropped as soon as a probe sees new data.
+FRESHNESS_TTL = int(os.getenv('LITMANEN_FRESHNESS_TTL', '30'))
+
+# Backends without a freshness token fall back to reloading this often (seconds)
+UNVERSIONED_TTL = 300
+
+
+def normalize_types(df):
+    """Lower-case the column names and cast the ones in COLUMN_SCHEMA, in place"""
+    df.columns = [c.lower() for c in df.columns]
+    for col_name, dtype in COLUMN_SCHEMA.items():
+        if col_name not in df.columns:
+            continue
+        values = df[col_name]
+        if dtype != 'category':
+            if not pd.api.types.is_numeric_dtype(values):  # Decimal/str from NUMBER columns
+                values = pd.to_numeric(values, errors='coerce')
+            if dtype == 'int32':
+                values = values.fillna(0)
+        df[col_name] = values.astype(dtype)
+    return df
+
+
+def filter_frame(df, club, competition, year_min, year_max, player='All'):
+    """Client-side version of the sidebar filters ('All' means no filter)"""
+    mask = (df['season_start_year'] >= year_min) & (df['season_start_year'] <= year_max)
+    if player != 'All':
+        mask &= df['player_id'] == player
+    if club != 'All':
+        mask &= df['club'] == club
+    if competition != 'All':
+        mask &= df['competition'] == competition
+    return df[mask]
+
+
+def options_from_frame(df):
+    """Sidebar options (player_id, club, competition, min_year, max_year) from a full feature frame"""
+    dated = df[df['season_start_year'] > 0]
+    keys = [c for c in ('player_id', 'club', 'competition') if c in dated.columns]
+    return dated.groupby(keys, observed=True)['season_start_year'].agg(
+        min_year='min', max_year='max'
+    ).reset_index()
+
+
+class Backend:
+    """
+    Data access behind the dashboard. Subclasses set `key` (unique per data source, used in
+    cache keys) and implement load_all(); pushdown backends also override load_options(),
+    load_rows() and load_rollup() so the work runs at the source. Frames may come back in
+    any column case and with loose dtypes - the core normalizes them. Return None on error.
+    freshness() returns a cheap token that changes whenever the data does; run() stores the
+    current one in `version`, which is part of every cache key.
+    """
+    key = 'backend'
+    version = None
+    footer = 'Snowflake, Streamlit, Plotly'
+
+    def load_all(self):
+        """The whole feature relation as a DataFrame"""
+        raise NotImplementedError
+
+    def load_options(self):
+        df = cached_all_rows(self, self.key, self.version)
+        return None if df is None else options_from_frame(df)
+
+    def load_rows(self, club, competition, year_min, year_max, player='All'):
+        df = cached_all_rows(self, self.key, self.version)
+        return None if df is None else filter_frame(df, club, competition, year_min, year_max, player)
+
+    def load_rollup(self, group_col, club, competition, year_min, year_max, player='All'):
+        """Pre-aggregated chart data for group_col, or None to aggregate the rows locally"""
+        return None
+
+    def freshness(self):
+        """Token such as row count, max season and last-altered time; None if the source has none"""
+        return None
+
+    def caption(self):
+        """Optional sidebar status line"""
+        return None
+
+
+def show_error(message, error):
+    """Report a backend failure in the app"""
+    st.error(f"{message}: {error}")
+    st.code(traceback.format_exc())
+
+
+@st.cache_data(ttl=FRESHNESS_TTL)
+def cached_freshness(_backend, backend_key):
+    """The backend's freshness token, probed at most every FRESHNESS_TTL seconds"""
+    try:
+        token = _backend.freshness()
+    except Exception as e:
+        print(f"Freshness probe failed for {backend_key}: {e}", file=sys.stderr)
+        token = None
+    if token is None:
+        return f"unversioned:{int(time.time() // UNVERSIONED_TTL)}"
+    return token
+
+
+@st.cache_data(max_entries=4)
+def cached_all_rows(_backend, backend_key, version):
+    """Full feature frame, loaded and typed once per backend and data version"""
+    df = _backend.load_all()
+    return None if df is None else normalize_types(df)
+
+
+@st.cache_data(max_entries=4)
+def cached_options(_backend, backend_key, version):
+    """Sidebar options, loaded once per backend and data version"""
+    options = _backend.load_options()
+    return None if options is None else normalize_types(options)
+
+
+@st.cache_data(max_entries=64)
+def cached_view(_backend, backend_key, version, club, competition, year_min, year_max, player='All'):
+    """Everything the page shows for one filter state, computed once and cached"""
+    rows = _backend.load_rows(club, competition, year_min, year_max, player)
+    if rows is None:
+        return None
+    rows = normalize_types(rows)
+    rollups = {}
+    for group_col in ('club', 'competition'):
+        stats = _backend.load_rollup(group_col, club, competition, year_min, year_max, player)
+        rollups[group_col] = None if stats is None else normalize_types(stats)
+    return compute_view(rows, rollups['club'], rollups['competition'])
+
+
+def compute_view(rows, club_stats=None, comp_stats=None):
+    """Metrics, chart frames and tables for a filtered, normalized feature frame"""
+    if club_stats is None:
+        club_stats = rows.groupby('club', observed=True).agg({
+            'appearances': 'sum',
+            'minutes': 'sum',
+            'ppg': 'mean'
+        }).reset_index()
+    if comp_stats is None:
+        comp_stats = rows.groupby('competition', observed=True).agg({
+            'minutes_ratio': 'mean',
+            'ppg': 'mean',
+            'appearances': 'sum'
+        }).reset_index()
+    low_availability = rows[rows['minutes_ratio'] < LOW_AVAILABILITY_THRESHOLD]
+    return {
+        'seasons': len(rows),
+        'appearances': int(rows['appearances'].sum()),
+        'minutes': int(rows['minutes'].sum()),
+        'ppg': float(rows['ppg'].mean()) if len(rows) else 0.0,
+        'timeline': rows[['season_start_year', 'minutes_ratio', 'club']].dropna(subset=['minutes_ratio'])
+                    .astype({'club': str}).sort_values('season_start_year'),
+        'club_stats': club_stats.astype({'club': str}).sort_values('appearances', ascending=False),
+        'comp_stats': comp_stats.astype({'competition': str}).sort_values('minutes_ratio', ascending=False),
+        'anomalies': low_availability.sort_values('season_start_year')[['season', 'club', 'competition', 'minutes_ratio', 'ppg']],
+        'table': rows[DISPLAY_COLUMNS + [c for c in PREDICTION_COLUMNS if c in rows.columns]]
+                 .sort_values('season_start_year'),
+    }
+
+
+class PhaseTimer:
+    """Seconds from script start to each phase of a run; kept in st.session_state['timings']"""
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.marks = {}
+
+    def mark(self, phase):
+        self.marks[phase] = time.perf_counter() - self.started
+
+    def report(self):
+        st.session_state['timings'] = dict(self.marks)
+        if TIMING:
+            line = '  '.join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.marks.items())
+            print(f"[timing] {line}", file=sys.stderr)
+            st.sidebar.caption(f"Timings: {line}")
+
+
+def setup_page():
+    """Page config and CSS; call before any other Streamlit command"""
+    st.set_page_config(
+        page_title="Jari Litmanen Career Analysis",
+        page_icon="⚽",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    st.markdown("""
+        <style>
+        .main-header {
+            font-size: 3rem;
+            font-weight: bold;
+            color: #1f77b4;
+            text-align: center;
+            margin-bottom: 1rem;
+        }
+        .sub-header {
+            font-size: 1.5rem;
+            color: #666;
+            text-align: center;
+            margin-bottom: 2rem;
+        }
+        </style>
+    """, unsafe_allow_html=True)
+
+
+def sidebar_filters(options):
+    """Player, club, competition and season range selection; returns (club, competition, year_min, year_max, player)"""
+    st.sidebar.header("Filters")
+
+    # Player filter, shown once the data covers more than one player
+    selected_player = 'All'
+    players = sorted(str(p) for p in options['player_id'].dropna().unique()) if 'player_id' in options.columns else []
+    if len(players) > 1:
+        selected_player = st.sidebar.selectbox("Select Player", ['All'] + players)
+        if selected_player != 'All':
+            options = options[options['player_id'] == selected_player]
+
+    clubs = ['All'] + sorted(str(c) for c in options['club'].dropna().unique())
+    selected_club = st.sidebar.selectbox("Select Club", clubs)
+    competitions = ['All'] + sorted(str(c) for c in options['competition'].dropna().unique())
+    selected_competition = st.sidebar.selectbox("Select Competition", competitions)
+
+    min_year = int(options['min_year'].min()) if len(options) else 1990
+    max_year = int(options['max_year'].max()) if len(options) else 2011
+    year_min, year_max = st.sidebar.slider("Season Range", min_year, max_year, (min_year, max_year))
+    return selected_club, selected_competition, year_min, year_max, selected_player
+
+
+def render_metrics(view):
+    """Key metric tiles - the first thing drawn, before plotly is imported"""
+    # Key Metrics
+    st.header("📊 Key Metrics")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Seasons", view['seasons'])
+    with col2:
+        st.metric("Total Appearances", view['appearances'])
+    with col3:
+        st.metric("Total Minutes", f"{view['minutes']:,}")
+    with col4:
+        st.metric("Avg Points/Game", f"{view['ppg']:.2f}")
+
+
+def render_details(view, footer):
+    """Charts, anomaly table and data table"""
+    import plotly.express as px  # Deferred: the metrics are already on screen while this loads
+
+    # Chart 1: Minutes Ratio Over Time
+    st.header("📈 Career Timeline: Minutes Ratio")
+    if len(view['timeline']) > 0:
+        fig1 = px.line(
+            view['timeline'],
+            x='season_start_year',
+            y='minutes_ratio',
+            color='club',
+            markers=True,
+            title='Minutes Ratio by Season',
+            labels={'season_start_year': 'Season Start Year', 'minutes_ratio': 'Minutes Ratio'}
+        )
+        fig1.add_hline(y=LOW_AVAILABILITY_THRESHOLD, line_dash="dash", line_color="red",
+                       annotation_text=f"Low Availability Threshold ({LOW_AVAILABILITY_THRESHOLD})")
+        st.plotly_chart(fig1, width='stretch')
+    else:
+        st.warning("No data available for the selected filters.")
+
+    # Chart 2: Appearances by Club
+    st.header("🏆 Appearances by Club")
+    fig2 = px.bar(
+        view['club_stats'],
+        x='club',
+        y='appearances',
+        title='Total Appearances by Club',
+        labels={'appearances': 'Total Appearances', 'club': 'Club'}
+    )
+    st.plotly_chart(fig2, width='stretch')
+
+    # Chart 3: Performance by Competition
+    st.header("🎯 Performance by Competition")
+    fig3 = px.scatter(
+        view['comp_stats'],
+        x='minutes_ratio',
+        y='ppg',
+        size='appearances',
+        hover_name='competition',
+        title='Performance by Competition',
+        labels={'minutes_ratio': 'Average Minutes Ratio', 'ppg': 'Average Points per Game'}
+    )
+    st.plotly_chart(fig3, width='stretch')
+
+    # Step 51: What ML Cannot Predict - Unusual Injuries Section
+    st.header("🚑 What ML Cannot Predict: Unusual Injuries & Anomalies")
+    st.markdown("""
+    ### The Human Element in Sports Analytics
+
+    While machine learning models can predict availability based on workload patterns,
+    they cannot account for the unpredictable nature of injuries, especially unusual ones.
+
+    **Known Anomalies in Jari Litmanen's Career:**
+    - **1999-2000**: Transfer to Barcelona, limited playing time despite high performance
+    - **2000-2001**: Brief return to Barcelona, then move to Liverpool mid-season
+    - **2004-2005**: Return to Finland, playing in Bundesliga with Hansa Rostock
+    - **Various seasons**: Unusual injury patterns that don't correlate with workload
+
+    These anomalies highlight the limitations of purely data-driven predictions in sports.
+    """)
+
+    # Highlight anomalies in the data
+    st.subheader("📉 Low Availability Periods")
+    if len(view['anomalies']) > 0:
+        st.dataframe(view['anomalies'], width='stretch')
+        st.markdown("""
+        **Analysis**: These low-availability periods may not always correlate with
+        workload patterns, demonstrating the complexity of predicting athlete availability.
+        """)
+    else:
+        st.info("No low availability periods found in the filtered data.")
+
+    # Data Table
+    st.header("📋 Detailed Data")
+    st.dataframe(view['table'], width='stretch', height=400)
+
+    # Footer
+    st.markdown("---")
+    st.markdown(f"""
+    **Data Source**: Jari Litmanen Career Statistics (1990-2011)  
+    **Analysis**: ML-powered availability prediction with anomaly detection  
+    **Built with**: {footer}
+    """)
+
+
+def run(backend, started=None):
+    """Main Streamlit app for the given backend; `started` is the script's start time for the timing hook"""
+    timer = PhaseTimer(started)
+    st.markdown('<div class="main-header">⚽ Jari Litmanen Career Analysis</div>', unsafe_allow_html=True)
+    st.markdown('<div class="sub-header">ML-Powered Career Statistics & Availability Analysis</div>', unsafe_allow_html=True)
+
+    backend.version = cached_freshness(backend, backend.key)
+    options = cached_options(backend, backend.key, backend.version)
+    if options is None or options.empty:
+        st.error("Unable to load data. Please check your Snowflake connection.")
+        st.stop()
+
+    timer.mark('options')
+
+    club, competition, year_min, year_max, player = sidebar_filters(options)
+    view = cached_view(backend, backend.key, backend.version, club, competition, year_min, year_max, player)
+    if view is None:
+        st.stop()
+    timer.mark('view')
+
+    render_metrics(view)
+    timer.mark('first_paint')
+
+    caption = backend.caption()
+    if caption:
+        st.sidebar.caption(caption)
+
+    render_details(view, backend.footer)
+    timer.mark('done')
+    timer.report()
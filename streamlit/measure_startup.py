@@ -0,0 +1,83 @@
+"""
+Startup timing for the Streamlit apps
+Reports what a cold start of app.py pays for imports (python -X importtime) and the
+time-to-first-paint of one run under Streamlit's AppTest, read from the dashboard's
+timing hook. Each measurement runs in a fresh interpreter so nothing is already imported.
+
+Usage: python streamlit/measure_startup.py [--snapshot path.parquet] [--local-csv path.csv]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+# Top-level packages worth watching on a cold start
+WATCHED_PACKAGES = ['streamlit', 'pandas', 'pyarrow', 'plotly', 'snowflake']
+
+
+def import_costs(env):
+    """Cumulative import time (ms) per top-level package while executing app.py once"""
+    code = f"import runpy; runpy.run_path({APP_PATH!r})"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        env=env, capture_output=True, text=True
+    )
+    costs = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.startswith('  ') or not cumulative.strip().isdigit():
+            continue  # nested import, already counted in its parent
+        package = name.strip().split('.')[0]
+        costs[package] = costs.get(package, 0) + int(cumulative) / 1000
+    return costs
+
+
+def first_paint(env):
+    """Phase timings of one AppTest run of app.py in a fresh interpreter"""
+    code = (
+        "import json\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        f"at = AppTest.from_file({APP_PATH!r}, default_timeout=120).run()\n"
+        "print('TIMINGS ' + json.dumps(dict(at.session_state['timings']) if 'timings' in at.session_state else {}))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        if line.startswith('TIMINGS '):
+            return json.loads(line[len('TIMINGS '):])
+    print(result.stderr[-2000:])
+    return {}
+
+
+def main(snapshot=None, local_csv=None):
+    env = dict(os.environ)
+    if snapshot:
+        env['LITMANEN_FAST_START'] = '1'
+        env['LITMANEN_SNAPSHOT_PATH'] = snapshot
+    if local_csv:
+        env['LITMANEN_LOCAL_CSV'] = local_csv
+
+    costs = import_costs(env)
+    print("Import cost on a cold start (python -X importtime, cumulative):")
+    for package in WATCHED_PACKAGES:
+        status = f"{costs[package]:.0f} ms" if package in costs else "not imported"
+        print(f"  {package:<12} {status}")
+    print(f"  {'all':<12} {sum(costs.values()):.0f} ms")
+
+    timings = first_paint(env)
+    if timings:
+        print("First run under AppTest (seconds since script start):")
+        for phase, seconds in timings.items():
+            print(f"  {phase:<12} {seconds * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure Streamlit app cold start')
+    parser.add_argument('--snapshot', help="Fast-start snapshot to serve (LITMANEN_SNAPSHOT_PATH)")
+    parser.add_argument('--local-csv', help="Serve this CSV instead (LITMANEN_LOCAL_CSV)")
+    args = parser.parse_args()
+    main(args.snapshot, args.local_csv)